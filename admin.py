@@ -0,0 +1,353 @@
+import re
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import or_
+from extensions import logo_storage, logo_jobs, live_updates
+from helpers import admin_required, invalidates_cache, allowed_file
+from auth import forget_users
+from league import (aggregate_standings_totals, game_standing_contribution, apply_standing_delta, aggregate_player_totals,
+                    player_stat_contribution, apply_player_totals_delta, import_box_scores, calculate_all_standings, load_results_matrix,
+                    current_season_id, season_game_ids, claim_game_version, write_box_score, apply_box_score_change, recount_game_scores)
+from queries import teams_with_players, game_with_rosters, in_season
+from scheduler import build_plan
+from importer import IMPORT_FORMATS, detect_format
+from logos import read_logo_upload, store_team_logo, remove_variants
+from live import game_result_delta
+from models import db, User, Team, Player, Game, PlayerStat, Season, TeamStanding, PlayerSeasonTotals, STAT_FIELDS, parse_game_date, parse_start_time
+
+# --- 管理ページ (ロスター・日程・試合結果の登録と削除) ---
+bp = Blueprint('admin', __name__)
+
+def publish_game_result(game, change=None):
+    # 保存した試合の結果・両チームの順位表の行・各順位表の並びを、ライブスコアの購読者に配信する (コミット後に呼ぶ)
+    # データバージョンはまだ進んでいないので、対戦成績表はキャッシュを使わずに読み直す。change はボックススコアの変更記録
+    live_updates.publish('game', game_result_delta(game, *calculate_all_standings(load_results_matrix()), change))
+
+def in_closed_season(game):
+    # 終了したシーズンの試合は成績をアーカイブ済みなので、結果の変更・削除はさせない
+    return game.season_id is not None and not db.session.get(Season, game.season_id).is_active
+
+def has_closed_season_games(*criteria):
+    # 条件に合う試合が終了したシーズンにあるか (あればアーカイブと食い違うので、その試合に関わる削除はさせない)
+    return db.session.query(Game.id).join(Season, Game.season_id == Season.id).filter(Season.is_active == False, *criteria).first() is not None
+
+def claim_submitted_version(game):
+    # フォームの版 (編集画面を開いたときの Game.version) が今も最新なら版を進めて True。
+    # 他の管理者やインポートが先に保存していれば、古い内容で上書きしないように False
+    version = request.form.get('version', type=int)
+    if version is not None and claim_game_version(game.id, version): return True
+    db.session.rollback()
+    flash('他の管理者がこの試合の結果を先に更新しました。最新の内容を確認してから保存し直してください。')
+    return False
+
+# ★★★ ここが修正された roster 関数 ★★★
+@bp.route('/roster', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def roster():
+    if request.method == 'POST':
+        action = request.form.get('action')
+        if action == 'add_team':
+            team_name = request.form.get('team_name'); league = request.form.get('league')
+            logo_data = None
+            if 'logo_image' in request.files:
+                file = request.files['logo_image']
+                if file and file.filename != '' and allowed_file(file.filename):
+                    try: logo_data = read_logo_upload(file)
+                    except ValueError as e:
+                        flash(f"画像アップロードに失敗しました: {e}"); return redirect(url_for('admin.roster'))
+                elif file.filename != '': flash('許可されていないファイル形式です。'); return redirect(url_for('admin.roster'))
+            if team_name and league:
+                if not Team.query.filter_by(name=team_name).first():
+                    new_team = Team(name=team_name, league=league)
+                    db.session.add(new_team); db.session.commit()
+                    flash(f'チーム「{team_name}」が{league}に登録されました。')
+                    if logo_data:
+                        logo_jobs.submit(f'チーム「{team_name}」のロゴを保存', store_team_logo, new_team.id, logo_data, file.filename)
+                        flash('ロゴはバックグラウンドで保存しています。数秒後に反映されます。')
+                    for i in range(1, 11):
+                        player_name = request.form.get(f'player_name_{i}')
+                        if player_name:
+                            new_player = Player(name=player_name, team_id=new_team.id); db.session.add(new_player)
+                    db.session.commit()
+                else: flash(f'チーム「{team_name}」は既に存在します。')
+            else: flash('チーム名とリーグを選択してください。')
+
+        elif action == 'add_player':
+            player_name = request.form.get('player_name'); team_id = request.form.get('team_id')
+            if player_name and team_id:
+                new_player = Player(name=player_name, team_id=team_id)
+                db.session.add(new_player); db.session.commit()
+                flash(f'選手「{player_name}」が登録されました。')
+            else: flash('選手名とチームを選択してください。')
+
+        elif action == 'promote_user':
+            username_to_promote = request.form.get('username_to_promote')
+            if username_to_promote:
+                user_to_promote = User.query.filter_by(username=username_to_promote).first()
+                if user_to_promote:
+                    if user_to_promote.role != 'admin':
+                        user_to_promote.role = 'admin'; db.session.commit(); forget_users()
+                        flash(f'ユーザー「{username_to_promote}」を管理者に昇格させました。')
+                    else: flash(f'ユーザー「{username_to_promote}」は既に管理者です。')
+                else: flash(f'ユーザー「{username_to_promote}」が見つかりません。')
+            else: flash('ユーザー名を入力してください。')
+
+        elif action == 'edit_player':
+            player_id = request.form.get('player_id', type=int); new_name = request.form.get('new_name')
+            player = Player.query.get(player_id)
+            if player and new_name: player.name = new_name; db.session.commit(); flash(f'選手名を「{new_name}」に変更しました。')
+
+        elif action == 'transfer_player':
+            player_id = request.form.get('player_id', type=int); new_team_id = request.form.get('new_team_id', type=int)
+            player = Player.query.get(player_id); new_team = Team.query.get(new_team_id)
+            if player and new_team:
+                old_team_name = player.team.name
+                player.team_id = new_team_id; db.session.commit()
+                flash(f'選手「{player.name}」を{old_team_name}から{new_team.name}に移籍させました。')
+
+        # ★★★ ここが追加された「ロゴ更新」機能 ★★★
+        elif action == 'update_logo':
+            team_id = request.form.get('team_id', type=int)
+            team = Team.query.get(team_id)
+
+            if not team:
+                flash('対象のチームが見つかりません。')
+                return redirect(url_for('admin.roster'))
+
+            if 'logo_image' in request.files:
+                file = request.files['logo_image']
+                
+                if file and file.filename != '' and allowed_file(file.filename):
+                    # 画像の検証だけリクエスト内で行い、保存・縮小版の作成・古い画像の削除はバックグラウンドのジョブに任せる
+                    try:
+                        logo_data = read_logo_upload(file)
+                        logo_jobs.submit(f'チーム「{team.name}」のロゴを更新', store_team_logo, team.id, logo_data, file.filename)
+                        flash(f'チーム「{team.name}」のロゴの更新を受け付けました。数秒後に反映されます。')
+                    except ValueError as e:
+                        flash(f"ロゴの更新に失敗しました: {e}")
+                        
+                elif file.filename != '':
+                    flash('許可されていないファイル形式です。')
+            else:
+                flash('ロゴファイルが選択されていません。')
+        
+        # どの action でも、処理が終わったら roster ページにリダイレクト
+        return redirect(url_for('admin.roster'))
+
+    # GETリクエスト（通常のページ表示）の場合
+    teams = teams_with_players().all(); users = User.query.all()
+    return render_template('roster.html', teams=teams, users=users, logo_job_list=logo_jobs.recent())
+
+@bp.route('/logo_jobs/<job_id>')
+@login_required
+@admin_required
+def logo_job_status(job_id):
+    job = logo_jobs.get(job_id)
+    if job is None: return jsonify({'error': 'unknown job'}), 404
+    return jsonify(job)
+
+@bp.route('/add_schedule', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def add_schedule():
+    if request.method == 'POST':
+        game_date = parse_game_date(request.form['game_date']); start_time = parse_start_time(request.form['start_time'])
+        if game_date is None or start_time is None:
+            flash("日付または開始時刻の形式が正しくありません。"); return redirect(url_for('admin.add_schedule'))
+        home_team_id = request.form['home_team_id']; away_team_id = request.form['away_team_id']
+        game_password = request.form.get('game_password')
+        if home_team_id == away_team_id:
+            flash("ホームチームとアウェイチームは同じチームを選択できません。"); return redirect(url_for('admin.add_schedule'))
+        new_game = Game(game_date=game_date, start_time=start_time, home_team_id=home_team_id, away_team_id=away_team_id, game_password=game_password,
+                        season_id=current_season_id())
+        db.session.add(new_game); db.session.commit()
+        flash("新しい試合日程が追加されました。"); return redirect(url_for('public.schedule'))
+    teams = Team.query.all()
+    return render_template('add_schedule.html', teams=teams)
+
+@bp.route('/auto_schedule', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def auto_schedule():
+    if request.method == 'POST':
+        form = request.form
+        start_date = parse_game_date(form.get('start_date')); weekdays = form.getlist('weekdays'); times_str = form.get('times')
+        if not all([start_date, weekdays, times_str]):
+            flash('すべての項目を入力してください。'); return redirect(url_for('admin.auto_schedule'))
+        teams = [(team.id, team.league) for team in Team.query.order_by(Team.id)]
+        if len(teams) < 2:
+            flash('対戦するには少なくとも2チーム必要です。'); return redirect(url_for('admin.auto_schedule'))
+        times = [parse_start_time(t) for t in times_str.split(',')]
+        if None in times:
+            flash('開始時刻は「22:40, 23:20」のように入力してください。'); return redirect(url_for('admin.auto_schedule'))
+        blackout_dates = [parse_game_date(d) for d in re.split(r'[\s,]+', form.get('blackout_dates', '')) if d]
+        if None in blackout_dates:
+            flash('休止日は「2025-08-13」のように入力してください。'); return redirect(url_for('admin.auto_schedule'))
+        plan = build_plan(teams, start_date, [int(d) for d in weekdays], times, double=bool(form.get('double')),
+                          inter_league=bool(form.get('inter_league')), blackout_dates=blackout_dates)
+        if not plan:
+            flash('同じリーグに2チーム以上ないため、作成できる試合がありません。'); return redirect(url_for('admin.auto_schedule'))
+        if form.get('action') != 'create':
+            # 確認画面: まだ何も登録せず、同じ条件を hidden で持ち回って「作成する」で再度 POST させる
+            team_names = dict(db.session.query(Team.id, Team.name).all())
+            return render_template('auto_schedule.html', plan=plan, team_names=team_names, form=form)
+        season_id = current_season_id()
+        db.session.execute(db.insert(Game), [{**row, 'season_id': season_id} for row in plan]); db.session.commit()
+        flash(f'{len(plan)}試合の総当たり日程を自動作成しました。'); return redirect(url_for('public.schedule'))
+    return render_template('auto_schedule.html')
+
+@bp.route('/team/delete/<int:team_id>', methods=['POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def delete_team(team_id):
+    team_to_delete = Team.query.get_or_404(team_id)
+    team_games = db.select(Game.id).where(or_(Game.home_team_id == team_id, Game.away_team_id == team_id))
+    team_players = db.select(Player.id).where(Player.team_id == team_id)
+    if has_closed_season_games(or_(Game.id.in_(team_games), Game.id.in_(db.select(PlayerStat.game_id).where(PlayerStat.player_id.in_(team_players))))):
+        flash('終了したシーズンに試合や成績の記録があるチームは削除できません。'); return redirect(url_for('admin.roster'))
+    if team_to_delete.logo_image:
+        logo_jobs.submit(f'チーム「{team_to_delete.name}」のロゴを削除', logo_storage.delete, team_to_delete.logo_image)
+    remove_variants(current_app.config['LOGO_CACHE_DIR'], team_id)
+    # 試合数によらず一定数の一括 DELETE で削除する。集計テーブル (進行中のシーズンの分) も同じトランザクションで差し引く
+    season_team_games = team_games.where(in_season())
+    # 他チームどうしの試合に残る所属選手の成績 (移籍前の試合)。行を消した後でその試合のスコアを数え直す
+    other_games = [game_id for (game_id,) in db.session.query(PlayerStat.game_id).filter(
+        PlayerStat.player_id.in_(team_players), PlayerStat.game_id.not_in(team_games)).distinct()]
+    apply_standing_delta(aggregate_standings_totals(Game.id.in_(season_team_games)), {})
+    apply_player_totals_delta(aggregate_player_totals(PlayerStat.game_id.in_(season_team_games)), {})
+    PlayerStat.query.filter(or_(PlayerStat.game_id.in_(team_games), PlayerStat.player_id.in_(team_players))).delete(synchronize_session=False)
+    recount_game_scores(other_games)
+    PlayerSeasonTotals.query.filter(PlayerSeasonTotals.player_id.in_(team_players)).delete(synchronize_session=False)
+    TeamStanding.query.filter_by(team_id=team_id).delete(synchronize_session=False)
+    Game.query.filter(Game.id.in_(team_games)).delete(synchronize_session=False)
+    Player.query.filter_by(team_id=team_id).delete(synchronize_session=False)
+    team_name = team_to_delete.name
+    Team.query.filter_by(id=team_id).delete(synchronize_session=False)
+    db.session.commit()
+    flash(f'チーム「{team_name}」と関連データを全て削除しました。'); return redirect(url_for('admin.roster'))
+
+@bp.route('/player/delete/<int:player_id>', methods=['POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def delete_player(player_id):
+    player_to_delete = Player.query.get_or_404(player_id)
+    player_name = player_to_delete.name
+    player_games = db.select(PlayerStat.game_id).where(PlayerStat.player_id == player_id)
+    if has_closed_season_games(Game.id.in_(player_games)):
+        flash(f'選手「{player_name}」は終了したシーズンに成績が残っているため削除できません。'); return redirect(url_for('admin.roster'))
+    # 出場した試合は成績の行を消した後でスコアを数え直し、順位表にも反映する
+    game_ids = [game_id for (game_id,) in db.session.execute(player_games.distinct())]
+    PlayerStat.query.filter_by(player_id=player_id).delete(synchronize_session=False)
+    recount_game_scores(game_ids)
+    PlayerSeasonTotals.query.filter_by(player_id=player_id).delete(synchronize_session=False)
+    Player.query.filter_by(id=player_id).delete(synchronize_session=False); db.session.commit()
+    flash(f'選手「{player_name}」と関連スタッツを削除しました。'); return redirect(url_for('admin.roster'))
+
+@bp.route('/game/delete/<int:game_id>', methods=['POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def delete_game(game_id):
+    game_to_delete = Game.query.get_or_404(game_id)
+    if in_closed_season(game_to_delete):
+        flash('終了したシーズンの試合は削除できません。'); return redirect(url_for('public.schedule'))
+    apply_standing_delta(game_standing_contribution(game_to_delete), {})
+    apply_player_totals_delta(player_stat_contribution(PlayerStat.query.filter_by(game_id=game_id).all()), {})
+    PlayerStat.query.filter_by(game_id=game_id).delete()
+    db.session.delete(game_to_delete); db.session.commit()
+    flash('試合日程を削除しました。'); return redirect(url_for('public.schedule'))
+
+@bp.route('/schedule/delete/all', methods=['POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def delete_all_schedules():
+    # 進行中のシーズンの試合だけを削除する (終了したシーズンの試合とアーカイブは残す)
+    try:
+        PlayerStat.query.filter(PlayerStat.game_id.in_(season_game_ids())).delete(synchronize_session=False)
+        Game.query.filter(in_season()).delete(synchronize_session=False)
+        db.session.query(TeamStanding).delete(synchronize_session=False)
+        db.session.query(PlayerSeasonTotals).delete(synchronize_session=False)
+        db.session.commit()
+        flash('進行中のシーズンの全ての日程と試合結果が正常に削除されました。')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'削除中にエラーが発生しました: {e}')
+    return redirect(url_for('public.schedule'))
+
+@bp.route('/game/<int:game_id>/forfeit', methods=['POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def forfeit_game(game_id):
+    game = Game.query.get_or_404(game_id); winning_team_id = request.form.get('winning_team_id', type=int)
+    if in_closed_season(game):
+        flash('終了したシーズンの試合結果は変更できません。'); return redirect(url_for('public.schedule'))
+    if winning_team_id not in (game.home_team_id, game.away_team_id):
+        flash('無効なチームが選択されました。'); return redirect(url_for('admin.edit_game', game_id=game_id))
+    if not claim_submitted_version(game): return redirect(url_for('admin.edit_game', game_id=game_id))
+    standing_before = game_standing_contribution(game)
+    game.winner_id = winning_team_id; game.loser_id = game.away_team_id if winning_team_id == game.home_team_id else game.home_team_id
+    game.is_finished = True; game.home_score = 0; game.away_score = 0
+    change = write_box_score(game.id, {})
+    apply_box_score_change(change)
+    apply_standing_delta(standing_before, game_standing_contribution(game))
+    db.session.commit(); publish_game_result(game, change)
+    flash('不戦勝として試合結果を記録しました。'); return redirect(url_for('public.schedule'))
+
+@bp.route('/game/<int:game_id>/edit', methods=['GET', 'POST'])
+@invalidates_cache
+def edit_game(game_id):
+    game = game_with_rosters(game_id)
+    if request.method == 'POST':
+        if not current_user.is_authenticated:
+            flash('結果を保存するにはログインが必要です。'); return redirect(url_for('auth.login'))
+        if in_closed_season(game):
+            flash('終了したシーズンの試合結果は変更できません。'); return redirect(url_for('public.schedule'))
+        if not claim_submitted_version(game): return redirect(url_for('admin.edit_game', game_id=game_id))
+        game.youtube_url_home = request.form.get('youtube_url_home'); game.youtube_url_away = request.form.get('youtube_url_away')
+        standing_before = game_standing_contribution(game)
+        # 送られた選手の成績を保存済みの行と比べ、変わった行だけを書き込む
+        submitted, scores = {}, {game.home_team_id: 0, game.away_team_id: 0}
+        for team in [game.home_team, game.away_team]:
+            for player in team.players:
+                if f'player_{player.id}_pts' in request.form:
+                    submitted[player.id] = {field: request.form.get(f'player_{player.id}_{field}', 0, type=int) for field in STAT_FIELDS}
+                    scores[team.id] += submitted[player.id]['pts'] or 0
+        change = write_box_score(game.id, submitted)
+        game.home_score = scores[game.home_team_id]; game.away_score = scores[game.away_team_id]
+        game.is_finished = True; game.winner_id = None; game.loser_id = None
+        apply_standing_delta(standing_before, game_standing_contribution(game))
+        apply_box_score_change(change)
+        db.session.commit(); publish_game_result(game, change)
+        flash('試合結果が更新されました。'); return redirect(url_for('public.schedule'))
+    stats = {
+        str(stat.player_id): {
+            'pts': stat.pts, 'reb': stat.reb, 'ast': stat.ast, 'stl': stat.stl, 'blk': stat.blk,
+            'foul': stat.foul, 'turnover': stat.turnover, 'fgm': stat.fgm, 'fga': stat.fga,
+            'three_pm': stat.three_pm, 'three_pa': stat.three_pa, 'ftm': stat.ftm, 'fta': stat.fta
+        } for stat in PlayerStat.query.filter_by(game_id=game_id).all()
+    }
+    return render_template('game_edit.html', game=game, stats=stats)
+
+@bp.route('/import_results', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@invalidates_cache
+def import_results():
+    if request.method == 'POST':
+        file = request.files.get('results_file')
+        if not file or not file.filename:
+            flash('ファイルを選択してください。'); return redirect(url_for('admin.import_results'))
+        fmt = request.form.get('format') or detect_format(file.filename)
+        if fmt not in IMPORT_FORMATS:
+            flash('CSV (.csv) か JSON lines (.jsonl) のファイルを選択してください。'); return redirect(url_for('admin.import_results'))
+        report = import_box_scores(file.stream, fmt)
+        return render_template('import_results.html', report=report, stat_fields=STAT_FIELDS)
+    return render_template('import_results.html', stat_fields=STAT_FIELDS)
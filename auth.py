@@ -0,0 +1,69 @@
+import time
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, session
+from flask_login import UserMixin, login_user, logout_user, login_required, current_user
+from extensions import login_manager, user_cache
+from models import db, User
+
+# --- ログイン・ログアウト・ユーザー登録 ---
+bp = Blueprint('auth', __name__)
+
+# --- ログイン中のユーザーの読み込み ---
+# current_user には ORM の User ではなく (ID, ユーザー名, 権限) だけを持つ CachedUser を入れ、
+# プロセス内のキャッシュ (USER_CACHE_TTL 秒) から作る。ユーザーの登録・権限の変更では forget_users() でキャッシュを無効にする。
+# SESSION_USER_RECORD が有効なら署名付きのセッションにも同じ内容と期限を入れ、期限までキャッシュも DB も見ない。
+# キャッシュのバージョンはプロセスごとなので、ワーカーやインスタンスをまたいで比べられる期限だけで判定する
+# (権限の変更は、セッションの記録を持つユーザーには最大 USER_CACHE_TTL 秒遅れて反映される)。
+SESSION_KEY = '_user_record'
+
+class CachedUser(UserMixin):
+    def __init__(self, id, username, role):
+        self.id = id; self.username = username; self.role = role
+    @property
+    def is_admin(self): return self.role == 'admin'
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id); use_session = current_app.config['SESSION_USER_RECORD']
+    if use_session:
+        stored = session.get(SESSION_KEY)
+        if stored and len(stored) == 4 and stored[0] == user_id and stored[3] > time.time():
+            return CachedUser(*stored[:3])
+    record = user_cache.get(user_id)
+    if record is None:
+        row = db.session.query(User.id, User.username, User.role).filter(User.id == user_id).first()
+        if row is None: return None
+        record = tuple(row); user_cache.set(user_id, record)
+    if use_session: session[SESSION_KEY] = [*record, time.time() + current_app.config['USER_CACHE_TTL']]
+    return CachedUser(*record)
+
+def forget_users():
+    # バージョンを進めてプロセス内のキャッシュをまとめて無効にする (登録・昇格はまれなので全員分の読み直しでよい)
+    user_cache.bump_version()
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated: return redirect(url_for('public.index'))
+    if request.method == 'POST':
+        user = User.query.filter_by(username=request.form['username']).first()
+        if user is None or not user.check_password(request.form['password']):
+            flash('ユーザー名またはパスワードが無効です'); return redirect(url_for('auth.login'))
+        session.pop(SESSION_KEY, None); login_user(user); return redirect(url_for('public.index'))
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user(); session.pop(SESSION_KEY, None); flash('ログアウトしました。'); return redirect(url_for('public.index'))
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        username = request.form['username']
+        if User.query.filter_by(username=username).first():
+            flash("そのユーザー名は既に使用されています。"); return redirect(url_for('auth.register'))
+        role = 'admin' if User.query.count() == 0 else 'user'
+        new_user = User(username=username, role=role)
+        new_user.set_password(request.form['password'])
+        db.session.add(new_user); db.session.commit(); forget_users()
+        flash(f"ユーザー登録が完了しました。ログインしてください。"); return redirect(url_for('auth.login'))
+    return render_template('register.html')
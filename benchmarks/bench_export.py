@@ -0,0 +1,34 @@
+# エクスポート (exporter.py) のベンチマーク
+# 行数を変えて player_stats を CSV に書き出し、時間と Python のメモリ使用量のピークが行数によらないことを確かめる。
+#   python benchmarks/bench_export.py [--rows 100 10000 200000] [--format csv]
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from models import db
+from exporter import export_select, stream_rows, iter_csv, iter_jsonl
+from bench_metrics import build_league
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000, 200000])
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    args = parser.parse_args()
+    for rows in args.rows:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all(); build_league(rows, 32)
+            tracemalloc.start(); started = time.perf_counter(); size = 0
+            columns, result = stream_rows(export_select('player_stats'))
+            for chunk in (iter_csv if args.format == 'csv' else iter_jsonl)(columns, result): size += len(chunk)
+            elapsed = time.perf_counter() - started; peak = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+            print(f'{rows:8d} rows  {elapsed * 1000:8.1f} ms  {size / 1e6:7.1f} MB written  peak {peak / 1e6:6.2f} MB')
+            db.session.remove(); db.drop_all()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# ライブスコア (/live) の配信のベンチマーク
+# 多数の SSE 購読者をスレッドで模擬し、試合結果を publish してから全員に届くまでの遅延と、発行された SQL の件数を測る。
+# 既定ではアプリの /live をテストクライアントで購読する (一時ファイルの SQLite に架空リーグを作る)。
+# --direct では HTTP 層を通さず LiveBroadcaster を直接購読し、ファンアウトそのものの上限を測る。
+#   python benchmarks/bench_live.py --subscribers 200 --events 20
+#   python benchmarks/bench_live.py --direct --subscribers 2000 --events 50
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def parse_events(chunks):
+    # SSE の本文から (event, data) を取り出す
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            block, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+            if 'event' in fields: yield fields['event'], json.loads(fields['data'])
+
+def run_subscribers(count, open_chunks, events, latencies, ready):
+    # 各購読者は events 件を受け取ったら終わる。遅延 = 受信時刻 - publish 時に入れた時刻
+    lock = threading.Lock()
+    def subscriber():
+        chunks, close = open_chunks()
+        ready.release(); received = 0
+        try:
+            for name, data in parse_events(chunks):
+                if name != 'game': continue
+                elapsed = time.perf_counter() - data['sent']
+                with lock: latencies.append(elapsed)
+                received += 1
+                if received == events: return
+        finally: close()
+    threads = [threading.Thread(target=subscriber, daemon=True) for _ in range(count)]
+    for thread in threads: thread.start()
+    return threads
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=200)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=0.05, help='publish の間隔 (秒)')
+    parser.add_argument('--direct', action='store_true', help='/live を通さず LiveBroadcaster を直接購読する')
+    args = parser.parse_args()
+    threading.stack_size(256 * 1024)
+    statements = [0]
+
+    if args.direct:
+        from live import LiveBroadcaster
+        broadcaster = LiveBroadcaster(max_subscribers=args.subscribers)
+        def open_chunks():
+            body = broadcaster.open_stream(broadcaster.parse_event_id(None), heartbeat=5, lifetime=600)
+            return iter(body), body.close
+        def publish(i):
+            broadcaster.publish('game', {'game': {'id': i}, 'standings': [], 'sent': time.perf_counter()})
+        context = None
+    else:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='nba2k-live-'), 'live.db')
+        os.environ['LIVE_MAX_SUBSCRIBERS'] = str(args.subscribers); os.environ['LIVE_HEARTBEAT_SECONDS'] = '5'; os.environ['SLOW_REQUEST_MS'] = ''
+        from app import create_app
+        from models import db, Game
+        from synthetic import generate_league
+        from league import rebuild_standings, rebuild_player_totals, calculate_all_standings, load_results_matrix
+        from live import game_result_delta
+        app = create_app()
+        context = app.app_context(); context.push()
+        db.create_all(); generate_league(teams=16, games=200); rebuild_standings(); rebuild_player_totals(); db.session.commit()
+        games = Game.query.filter_by(is_finished=True).limit(args.events).all()
+        broadcaster = app.extensions['live_updates']
+        def open_chunks():
+            response = app.test_client().get('/live', buffered=False)
+            if response.status_code != 200: raise RuntimeError(f'/live returned {response.status_code}')
+            return response.response, response.close
+        def publish(i):
+            # admin.publish_game_result と同じく、1回の publish で順位表と対戦成績を1回ずつ読む
+            game = games[i % len(games)]
+            delta = game_result_delta(game, *calculate_all_standings(load_results_matrix()))
+            broadcaster.publish('game', {**delta, 'sent': time.perf_counter()})
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count_statement(*_):
+        statements[0] += 1
+
+    latencies, ready = [], threading.Semaphore(0)
+    started = time.perf_counter()
+    threads = run_subscribers(args.subscribers, open_chunks, args.events, latencies, ready)
+    for _ in range(args.subscribers): ready.acquire()
+    while broadcaster.subscribers < args.subscribers: time.sleep(0.01)
+    print(f'{args.subscribers} subscribers connected in {time.perf_counter() - started:.2f}s ({"direct" if args.direct else "/live via test client"})')
+    statements[0] = 0; published = time.perf_counter(); publish_seconds = 0.0
+    for i in range(args.events):
+        t = time.perf_counter(); publish(i); publish_seconds += time.perf_counter() - t
+        time.sleep(args.interval)
+    for thread in threads: thread.join(60)
+    total = time.perf_counter() - published
+    expected = args.subscribers * args.events
+    print(f'delivered {len(latencies)}/{expected} events in {total:.2f}s, {statements[0]} SQL for {args.events} publishes')
+    print(f'publish  mean {publish_seconds / args.events * 1000:8.2f} ms')
+    if latencies:
+        print(f'latency  p50 {percentile(latencies, 0.5) * 1000:8.2f} ms  p95 {percentile(latencies, 0.95) * 1000:8.2f} ms  '
+              f'max {max(latencies) * 1000:8.2f} ms')
+    if context is not None: context.pop()
+    if len(latencies) != expected: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
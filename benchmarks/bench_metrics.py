@@ -0,0 +1,66 @@
+# アドバンスドスタッツ (metrics.py) のベンチマーク
+# 合成した 50,000 行のボックススコアをインメモリ SQLite に入れ、読み込み + 計算の時間を測る。
+#   python benchmarks/bench_metrics.py [--rows 50000] [--teams 32] [--repeat 5]
+import os
+import sys
+import time
+import argparse
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from models import db, Season, Team, Player, Game, PlayerStat, STAT_FIELDS
+from metrics import load_box_scores, compute_metrics, compute_league_metrics
+
+def build_league(rows, num_teams, players_per_team=10, seed=0):
+    # 1試合あたり 10 行 (両チーム5人ずつ) になるように試合数を決める
+    rng = np.random.default_rng(seed)
+    num_games = rows // 10
+    # 集計・エクスポートは進行中のシーズンの試合だけを対象にするので、全試合をシーズン1に入れる
+    db.session.execute(Season.__table__.insert(), [{'id': 1, 'name': 'シーズン1', 'is_active': True}])
+    db.session.execute(Team.__table__.insert(), [{'id': t + 1, 'name': f'Team {t + 1}', 'league': 'Aリーグ' if t % 2 else 'Bリーグ'} for t in range(num_teams)])
+    db.session.execute(Player.__table__.insert(), [{'id': p + 1, 'name': f'Player {p + 1}', 'team_id': p // players_per_team + 1}
+                                                   for p in range(num_teams * players_per_team)])
+    pairs = np.array([rng.choice(num_teams, 2, replace=False) + 1 for _ in range(num_games)])
+    stats, games = [], []
+    for game_index, (home, away) in enumerate(pairs):
+        scores = {}
+        for team in (home, away):
+            lineup = (team - 1) * players_per_team + rng.choice(players_per_team, 5, replace=False) + 1
+            for player_id in lineup:
+                fga = int(rng.integers(5, 25)); three_pa = int(rng.integers(0, fga // 2 + 1)); fta = int(rng.integers(0, 10))
+                fgm = int(rng.binomial(fga, 0.47)); three_pm = int(rng.binomial(three_pa, 0.35)); ftm = int(rng.binomial(fta, 0.75))
+                row = dict(zip(STAT_FIELDS, [2 * fgm + three_pm + ftm, int(rng.integers(0, 12)), int(rng.integers(0, 15)), int(rng.integers(0, 5)),
+                                             int(rng.integers(0, 4)), int(rng.integers(0, 6)), int(rng.integers(0, 6)), fgm, fga, three_pm, three_pa, ftm, fta]))
+                scores[team] = scores.get(team, 0) + row['pts']
+                stats.append({'game_id': game_index + 1, 'player_id': int(player_id), **row})
+        games.append({'id': game_index + 1, 'season_id': 1, 'home_team_id': int(home), 'away_team_id': int(away), 'is_finished': True,
+                      'home_score': scores[home], 'away_score': scores[away]})
+    db.session.execute(Game.__table__.insert(), games)
+    db.session.execute(PlayerStat.__table__.insert(), stats)
+    db.session.commit()
+    return len(stats)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--teams', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter(); count = build_league(args.rows, args.teams)
+        print(f'generated {count} box-score rows in {time.perf_counter() - started:.2f}s')
+        timings = {'load_box_scores': [], 'compute_metrics': [], 'compute_league_metrics': []}
+        for _ in range(args.repeat):
+            started = time.perf_counter(); box = load_box_scores(); timings['load_box_scores'].append(time.perf_counter() - started)
+            started = time.perf_counter(); result = compute_metrics(box); timings['compute_metrics'].append(time.perf_counter() - started)
+            started = time.perf_counter(); compute_league_metrics(); timings['compute_league_metrics'].append(time.perf_counter() - started)
+        print(f'{len(result["players"])} players, {len(result["teams"])} teams')
+        for name, values in timings.items():
+            print(f'{name:24s} best {min(values) * 1000:8.1f} ms  median {sorted(values)[len(values) // 2] * 1000:8.1f} ms')
+
+if __name__ == '__main__':
+    main()
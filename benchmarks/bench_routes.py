@@ -0,0 +1,130 @@
+# 公開ページのベンチマーク
+# ルートごとに p50 / p95 のレイテンシ、1リクエストあたりの SQL 件数、メモリのピークを測り、JSON に保存する。
+# 既定では Flask のテストクライアントでアプリを直接動かす (DB は --database-url、省略時は一時ファイルの SQLite)。
+#   python benchmarks/bench_routes.py --seed --output before.json
+#   python benchmarks/bench_routes.py --seed --database-url postgresql://localhost/nba2k_bench --output pg.json
+#   python benchmarks/bench_routes.py --seed --compare before.json
+# 起動済みのサーバー (gunicorn など) を測る場合は、METRICS_SERVER_TIMING=1 CACHE_MAX_ENTRIES=0 で起動して
+#   python benchmarks/bench_routes.py --base-url http://127.0.0.1:8000 [--server-pid PID]
+# SQL 件数はどちらの場合もアプリが返す Server-Timing ヘッダーから読む。
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROUTES = ['/', '/stats', '/schedule', '/schedule?team_id=1', '/api/games', '/api/games?team_id=1&is_finished=true',
+          '/api/metrics', '/export/games', '/export/player_stats?team_id=1']
+SQL_COUNT = re.compile(r'desc="(\d+) SQL"')
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def test_client_fetcher(args):
+    # アプリを読み込む前に環境変数で DB とキャッシュを設定する (--warm でなければページキャッシュを無効にする)
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'nba2k-bench.db')
+    os.environ['METRICS_SERVER_TIMING'] = '1'; os.environ['SLOW_REQUEST_MS'] = ''; os.environ['CACHE_BACKEND'] = 'memory'
+    if not args.warm: os.environ['CACHE_MAX_ENTRIES'] = '0'
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    app = create_app()
+    if args.seed:
+        result = app.test_cli_runner().invoke(args=['seed-benchmark', '--reset', '--teams', str(args.teams), '--players', str(args.players),
+                                                    '--games', str(args.games), '--seed', str(args.random_seed)])
+        if result.exit_code != 0: sys.exit(f'seed-benchmark failed:\n{result.output}')
+        print(result.output.strip())
+    client = app.test_client()
+    def fetch(route):
+        response = client.get(route); body = response.get_data()
+        return response.status_code, response.headers.get('Server-Timing', ''), len(body)
+    with app.app_context(): dialect = app.extensions['sqlalchemy'].engine.dialect.name
+    return fetch, dialect
+
+def http_fetcher(args):
+    import requests
+    session = requests.Session()
+    def fetch(route):
+        response = session.get(args.base_url.rstrip('/') + route, timeout=60)
+        return response.status_code, response.headers.get('Server-Timing', ''), len(response.content)
+    return fetch, 'remote'
+
+def server_peak_rss_mb(pid):
+    # Linux のみ: サーバープロセスの VmHWM (RSS のピーク)
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'): return round(int(line.split()[1]) / 1024, 1)
+    except OSError: return None
+
+def measure(fetch, route, args):
+    for _ in range(args.warmup): fetch(route)
+    latencies, queries = [], []
+    for _ in range(args.requests):
+        started = time.perf_counter(); status, timing, size = fetch(route); latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200: raise RuntimeError(f'{route} returned {status}')
+        match = SQL_COUNT.search(timing)
+        if match: queries.append(int(match.group(1)))
+    result = {'p50_ms': round(percentile(latencies, 0.5), 2), 'p95_ms': round(percentile(latencies, 0.95), 2),
+              'mean_ms': round(sum(latencies) / len(latencies), 2), 'queries': max(queries) if queries else None, 'bytes': size}
+    if args.base_url:
+        result['server_peak_rss_mb'] = server_peak_rss_mb(args.server_pid) if args.server_pid else None
+    else:
+        # 1回だけ tracemalloc を有効にして Python のメモリ確保のピークを測る (レイテンシの計測とは分ける)
+        tracemalloc.start(); fetch(route); result['py_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2); tracemalloc.stop()
+        result['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+def git_commit():
+    try: return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def print_results(results, baseline=None):
+    print(f'{"route":42s} {"p50 ms":>9s} {"p95 ms":>9s} {"SQL":>5s}' + ('   p50 vs baseline' if baseline else ''))
+    for route, result in results['routes'].items():
+        line = f'{route:42s} {result["p50_ms"]:9.1f} {result["p95_ms"]:9.1f} {result["queries"] if result["queries"] is not None else "-":>5}'
+        before = (baseline or {}).get('routes', {}).get(route)
+        if before: line += f'   {(result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100:+7.1f}% (was {before["p50_ms"]:.1f} ms, {before["queries"]} SQL)'
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='テストクライアントで使う DB (省略時は一時ファイルの SQLite)')
+    parser.add_argument('--base-url', help='起動済みのサーバーを HTTP で測る')
+    parser.add_argument('--server-pid', type=int, help='--base-url のサーバーのプロセス ID (RSS のピークを読む)')
+    parser.add_argument('--seed', action='store_true', help='測る前に flask seed-benchmark --reset でデータを作り直す')
+    parser.add_argument('--teams', type=int, default=32)
+    parser.add_argument('--players', type=int, default=15)
+    parser.add_argument('--games', type=int, default=500)
+    parser.add_argument('--random-seed', type=int, default=0)
+    parser.add_argument('--routes', nargs='+', default=ROUTES)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--warm', action='store_true', help='ページキャッシュを有効にしたまま測る')
+    parser.add_argument('--output', help='結果を JSON で保存する')
+    parser.add_argument('--compare', help='以前の結果の JSON と比べて表示する')
+    args = parser.parse_args()
+    if args.base_url and args.seed: parser.error('--seed cannot be used with --base-url; run flask seed-benchmark on the server')
+    fetch, dialect = http_fetcher(args) if args.base_url else test_client_fetcher(args)
+    results = {'meta': {'commit': git_commit(), 'created': datetime.now().isoformat(timespec='seconds'), 'database': dialect,
+                        'target': args.base_url or 'test-client', 'page_cache': args.warm, 'requests': args.requests,
+                        'scale': {'teams': args.teams, 'players': args.players, 'games': args.games, 'seed': args.random_seed} if args.seed else None,
+                        'python': platform.python_version()},
+               'routes': {route: measure(fetch, route, args) for route in args.routes}}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f: baseline = json.load(f)
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f: json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
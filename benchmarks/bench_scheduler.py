@@ -0,0 +1,42 @@
+# 日程自動作成 (scheduler.py) のベンチマーク
+# 200 チームの2回総当たりのプランを作り、インメモリ SQLite への一括 INSERT までの時間を測る。
+#   python benchmarks/bench_scheduler.py [--teams 200] [--leagues 1] [--repeat 5]
+import os
+import sys
+import time
+import argparse
+from datetime import date, time as clock
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from models import db, Team, Game
+from scheduler import build_plan
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=200)
+    parser.add_argument('--leagues', type=int, default=1)
+    parser.add_argument('--inter-league', action='store_true')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    teams = [(t + 1, f'League {t % args.leagues}') for t in range(args.teams)]
+    options = dict(start_date=date(2026, 1, 5), weekdays=[0, 2, 4], times=[clock(22, 0), clock(22, 40), clock(23, 20)],
+                   double=True, inter_league=args.inter_league, blackout_dates=[date(2026, 1, 7)])
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(Team.__table__.insert(), [{'id': team_id, 'name': f'Team {team_id}', 'league': league} for team_id, league in teams])
+        db.session.commit()
+        timings = {'build_plan': [], 'bulk_insert': []}
+        for _ in range(args.repeat):
+            started = time.perf_counter(); plan = build_plan(teams, **options); timings['build_plan'].append(time.perf_counter() - started)
+            started = time.perf_counter(); db.session.execute(db.insert(Game), plan); db.session.commit()
+            timings['bulk_insert'].append(time.perf_counter() - started)
+            db.session.query(Game).delete(); db.session.commit()
+        print(f'{args.teams} teams, {args.leagues} league(s): {len(plan)} games, {plan[0]["game_date"]} - {plan[-1]["game_date"]}')
+        for name, values in timings.items():
+            print(f'{name:12s} best {min(values) * 1000:8.1f} ms  median {sorted(values)[len(values) // 2] * 1000:8.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# 起動時間の予算チェック (Cloud Run のコールドスタート対策)
+# 新しい Python プロセスを何度か起動し、「import app にかかる時間」と「プロセス起動から最初のページ (/) が 200 を返すまで」を測る。
+# 中央値が予算を超えたら終了コード 1 を返すので、CI やデプロイ前の確認に使える。
+#   python benchmarks/startup_budget.py
+#   python benchmarks/startup_budget.py --import-budget-ms 500 --first-request-budget-ms 1200 --runs 7
+#   python benchmarks/startup_budget.py --server     # gunicorn 'app:create_app()' を起動し、HTTP で最初の 200 までを測る
+#   python benchmarks/startup_budget.py --modules    # 予算とは別に、読み込みに時間のかかるモジュールを表示する
+# DB は --database-url (省略時は一時ファイルの SQLite に小さな架空リーグを作る)。
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子プロセスで実行する計測。インタープリターの起動後から数える (起動自体の時間は interpreter_startup_ms で別に測る)
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/')
+finished = time.perf_counter()
+print(json.dumps({'status': response.status_code, 'import_ms': (imported - started) * 1000,
+                  'create_ms': (created - imported) * 1000, 'request_ms': (finished - created) * 1000}))
+'''
+
+def child_env(args):
+    env = dict(os.environ, DATABASE_URL=args.database_url, CACHE_BACKEND='memory', SLOW_REQUEST_MS='')
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+def seed_database(args):
+    # 最初のページが実際にクエリを発行するよう、小さな架空リーグを作っておく
+    code = ('import app; application = app.create_app(); '
+            'result = application.test_cli_runner().invoke(args=["seed-benchmark", "--reset", "--teams", "8", "--games", "40"]); '
+            'raise SystemExit(result.exit_code)')
+    subprocess.run([sys.executable, '-c', code], env=child_env(args), cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+def probe_in_process(args):
+    output = subprocess.run([sys.executable, '-c', PROBE], env=child_env(args), cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    if result['status'] != 200: raise RuntimeError(f'/ returned {result["status"]}')
+    # 最初のリクエストまでの時間 = インタープリターの起動 (何もしない python の起動時間) + import + create_app + 最初のリクエスト
+    result['first_request_ms'] = args.interpreter_ms + result['import_ms'] + result['create_ms'] + result['request_ms']
+    return result
+
+def interpreter_startup_ms(runs=5):
+    elapsed = []
+    for _ in range(runs):
+        started = time.perf_counter(); subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        elapsed.append((time.perf_counter() - started) * 1000)
+    return statistics.median(elapsed)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0)); return s.getsockname()[1]
+
+def probe_server(args):
+    # gunicorn を起動し、/ が 200 を返すまで 10 ms 間隔で問い合わせる
+    port = free_port(); url = f'http://127.0.0.1:{port}/'
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1', '--threads', '8', 'app:create_app()']
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=child_env(args), cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < args.timeout:
+            if server.poll() is not None: raise RuntimeError(f'gunicorn exited with {server.returncode}')
+            try:
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    if response.status == 200: return {'first_request_ms': (time.perf_counter() - started) * 1000}
+            except OSError: time.sleep(0.01)
+        raise RuntimeError(f'{url} did not return 200 within {args.timeout} s')
+    finally:
+        server.terminate(); server.wait()
+
+def import_profile(args, top=15):
+    # python -X importtime の累積時間が大きい順
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], env=child_env(args), cwd=ROOT,
+                            check=True, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='計測に使う DB (省略時は一時ファイルの SQLite を作る)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=600, help='import app の中央値の上限')
+    parser.add_argument('--first-request-budget-ms', type=float, default=1500, help='プロセス起動から最初の 200 までの中央値の上限')
+    parser.add_argument('--server', action='store_true', help='gunicorn を起動して HTTP で測る (import の時間は測らない)')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--modules', action='store_true', help='読み込みに時間のかかるモジュールも表示する')
+    parser.add_argument('--output', help='結果を JSON で保存する')
+    args = parser.parse_args()
+    if not args.database_url:
+        args.database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='nba2k-startup-'), 'startup.db')
+        seed_database(args)
+    args.interpreter_ms = interpreter_startup_ms()
+
+    runs = [probe_server(args) if args.server else probe_in_process(args) for _ in range(args.runs)]
+    medians = {key: round(statistics.median(run[key] for run in runs), 1) for key in runs[0] if key.endswith('_ms')}
+    budgets = {'first_request_ms': args.first_request_budget_ms}
+    if not args.server: budgets['import_ms'] = args.import_budget_ms
+    failures = []
+    print(f'{"median of " + str(args.runs) + " runs":28s} {"ms":>9s} {"budget":>9s}')
+    for key, value in medians.items():
+        budget = budgets.get(key)
+        if budget is not None and value > budget: failures.append(key)
+        print(f'{key:28s} {value:9.1f} {budget if budget is not None else "-":>9}{"  OVER BUDGET" if key in failures else ""}')
+    if args.modules:
+        print('\nslowest imports (cumulative):')
+        for elapsed, name in import_profile(args): print(f'  {elapsed:8.1f} ms  {name}')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'medians': medians, 'budgets': budgets, 'runs': runs, 'server': args.server}, f, indent=2)
+    if failures: sys.exit(1)
+
+if __name__ == '__main__':
+    main()
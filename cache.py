@@ -0,0 +1,141 @@
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# --- 公開ページ用のレスポンスキャッシュ ---
+# どのバックエンドも get/set に加えて「リーグのデータバージョン」を持つ。
+# 結果を書き込むルートがバージョンを更新すると、古いバージョンのキーは二度と参照されなくなる。
+# バージョンは再起動をまたいで古い ETag と一致しないよう、連番ではなくランダムな値にしている。
+
+class MemoryCache:
+    # プロセス内 LRU + TTL (gunicorn のワーカーが1つのときの既定)
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries; self.ttl = ttl
+        self._entries = OrderedDict(); self._lock = threading.Lock(); self._version = uuid.uuid4().hex
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]; return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value); self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version = uuid.uuid4().hex; self._entries.clear()
+
+
+class FileSystemCache:
+    # ディレクトリを共有することで複数ワーカー間でキャッシュとバージョンを共有する
+    def __init__(self, directory, max_entries=1024, ttl=300):
+        self.directory = directory; self.max_entries = max_entries; self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._version_path = os.path.join(directory, 'version')
+        if not os.path.exists(self._version_path): self.bump_version()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.cache')
+
+    def _write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f: f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f: expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError): return None
+        return value if expires >= time.time() else None
+
+    def set(self, key, value):
+        self._write(self._path(key), pickle.dumps((time.time() + self.ttl, value)))
+        entries = [name for name in os.listdir(self.directory) if name.endswith('.cache')]
+        if len(entries) > self.max_entries: self._prune(entries)
+
+    def _prune(self, entries):
+        # 古いものから削除して上限の半分まで減らす
+        paths = [os.path.join(self.directory, name) for name in entries]
+        paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+        for path in paths[:len(paths) - self.max_entries // 2]:
+            try: os.remove(path)
+            except OSError: pass
+
+    def get_version(self):
+        try:
+            with open(self._version_path) as f: return f.read().strip()
+        except OSError: return ''
+
+    def bump_version(self):
+        self._write(self._version_path, uuid.uuid4().hex.encode('ascii'))
+
+
+class SQLiteCache:
+    # 1つの SQLite ファイルを複数ワーカーで共有する。接続は操作ごとに開くのでスレッドをまたいでも安全
+    def __init__(self, path, max_entries=1024, ttl=300):
+        self.path = path; self.max_entries = max_entries; self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS page_cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT)')
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('version', ?)", (uuid.uuid4().hex,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn: yield conn
+        finally: conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, expires FROM page_cache WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] < time.time(): return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO page_cache (key, value, expires) VALUES (?, ?, ?)',
+                         (key, pickle.dumps(value), time.time() + self.ttl))
+            conn.execute('DELETE FROM page_cache WHERE expires < ?', (time.time(),))
+            conn.execute('DELETE FROM page_cache WHERE key NOT IN (SELECT key FROM page_cache ORDER BY expires DESC LIMIT ?)',
+                         (self.max_entries,))
+
+    def get_version(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM cache_meta WHERE name = 'version'").fetchone()
+        return row[0] if row else ''
+
+    def bump_version(self):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache_meta (name, value) VALUES ('version', ?)", (uuid.uuid4().hex,))
+            conn.execute('DELETE FROM page_cache')
+
+
+def create_cache(config):
+    # CACHE_BACKEND: memory (既定) / filesystem / sqlite
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = int(config.get('CACHE_TTL', 300)); max_entries = int(config.get('CACHE_MAX_ENTRIES', 256))
+    if backend == 'filesystem':
+        return FileSystemCache(config.get('CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'nba2k-page-cache'), max_entries=max_entries, ttl=ttl)
+    if backend == 'sqlite':
+        return SQLiteCache(config.get('CACHE_SQLITE_PATH') or os.path.join(tempfile.gettempdir(), 'nba2k-page-cache.db'), max_entries=max_entries, ttl=ttl)
+    if backend != 'memory':
+        raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+    return MemoryCache(max_entries=max_entries, ttl=ttl)
@@ -0,0 +1,181 @@
+import sys
+import click
+from flask import Blueprint
+from extensions import page_cache
+from league import rebuild_standings, rebuild_player_totals, import_box_scores, current_season_id
+from seasons import assign_unseasoned_games, close_season
+from logos import regenerate_logo_variants
+from queries import explain_route_queries
+from synthetic import generate_league
+from importer import IMPORT_FORMATS, detect_format
+from exporter import EXPORT_KINDS, EXPORT_FORMATS, export_select, stream_rows, iter_csv, iter_jsonl, write_parquet
+from migrations import migrate_schedule_columns, create_missing_indexes, add_missing_columns
+from models import db, Team, TeamStanding, PlayerSeasonTotals, parse_game_date
+
+# --- データベース初期化などの flask コマンド ---
+# cli_group=None なので「flask init-db」のようにトップレベルのコマンドになる。
+bp = Blueprint('commands', __name__, cli_group=None)
+
+@bp.cli.command('init-db')
+def init_db_command():
+    db.drop_all()
+    db.create_all()
+    current_season_id(); db.session.commit()
+    page_cache.bump_version()
+    print('Initialized the database.')
+
+@bp.cli.command('seed-benchmark')
+@click.option('--teams', type=int, default=32, show_default=True)
+@click.option('--players', 'players_per_team', type=int, default=15, show_default=True, help='1チームあたりの選手数。')
+@click.option('--games', type=int, default=500, show_default=True)
+@click.option('--finished', type=click.FloatRange(0, 1), default=0.8, show_default=True, help='終了済みにする試合の割合。')
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--reset', is_flag=True, help='既存のテーブルを全て削除してから作成する。')
+def seed_benchmark_command(teams, players_per_team, games, finished, seed, reset):
+    """ベンチマーク用の架空リーグを作成する (同じ引数なら毎回同じデータになる)。"""
+    if reset: db.drop_all()
+    db.create_all()
+    if Team.query.first() is not None: raise click.UsageError('The database already has teams; pass --reset to replace everything.')
+    counts = generate_league(teams=teams, players_per_team=players_per_team, games=games, finished=finished, seed=seed)
+    rebuild_standings(); rebuild_player_totals(); db.session.commit(); page_cache.bump_version()
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+@bp.cli.command('migrate-schema')
+def migrate_schema_command():
+    """既存のデータベースに不足しているテーブル・列・索引を追加し、Game の日付・時刻列を DATE/TIME 型に変換する。
+
+    シーズンに属していない試合 (シーズン導入前のデータ) は進行中のシーズンに入れる (シーズンが無ければ作る)。
+    最後に順位表と選手の通算成績の集計テーブルを作り直すので、移行直後から差分での更新が正しい値に積み上がる。
+    """
+    db.create_all()
+    added = add_missing_columns()
+    converted, invalid = migrate_schedule_columns()
+    created = create_missing_indexes()
+    season_name, assigned = assign_unseasoned_games()
+    standings_drift = rebuild_standings(); totals_drift = rebuild_player_totals()
+    db.session.commit(); page_cache.bump_version()
+    print(f'Added {len(added)} column(s): {", ".join(added) or "-"}')
+    print(f'Assigned {assigned} game(s) without a season to {season_name}.')
+    print(f'Rebuilt standings ({len(standings_drift)} team(s) corrected) and player totals ({len(totals_drift)} player(s) corrected).')
+    print(f'Converted {converted} game(s) to DATE/TIME ({len(invalid)} unparseable value(s) set to NULL).')
+    for game_id, raw_date, raw_time in invalid: print(f'  game {game_id}: game_date={raw_date!r} start_time={raw_time!r}')
+    print(f'Created {len(created)} index(es): {", ".join(created) or "-"}')
+
+@bp.cli.command('explain-queries')
+def explain_queries_command():
+    """各ルートの主要クエリを EXPLAIN し、索引が使われているかを表示する。
+
+    SQLite は EXPLAIN QUERY PLAN、Postgres は enable_seqscan を切った EXPLAIN で確認する
+    (行数の少ないテーブルでは Postgres が索引より全件走査を選ぶため)。
+    1つでも索引を使わないクエリがあれば終了コード 1 を返す。
+    """
+    failures = 0
+    for label, uses_index, plan in explain_route_queries():
+        print(f'[{"OK" if uses_index else "NO INDEX"}] {label}')
+        for line in plan: print(f'    {line}')
+        if not uses_index: failures += 1
+    if failures: sys.exit(1)
+
+@bp.cli.command('rebuild-standings')
+@click.option('--check', is_flag=True, help='保存済みの順位表と再計算結果を比較するだけで、書き込みは行わない。')
+def rebuild_standings_command(check):
+    TeamStanding.__table__.create(db.engine, checkfirst=True)
+    drift = rebuild_standings()
+    for team_id, stored, expected in drift:
+        print(f'Drift for team {team_id}: stored={stored} expected={expected}')
+    if check:
+        db.session.rollback()
+        print(f'{len(drift)} team(s) drifted.')
+        if drift: sys.exit(1)
+        return
+    db.session.commit(); page_cache.bump_version()
+    print(f'Rebuilt standings ({len(drift)} team(s) corrected).')
+
+@bp.cli.command('rebuild-player-totals')
+@click.option('--check', is_flag=True, help='保存済みの選手通算成績と再計算結果を比較するだけで、書き込みは行わない。')
+def rebuild_player_totals_command(check):
+    PlayerSeasonTotals.__table__.create(db.engine, checkfirst=True)
+    drift = rebuild_player_totals()
+    for player_id, stored, expected in drift:
+        print(f'Drift for player {player_id}: stored={stored} expected={expected}')
+    if check:
+        db.session.rollback()
+        print(f'{len(drift)} player(s) drifted.')
+        if drift: sys.exit(1)
+        return
+    db.session.commit(); page_cache.bump_version()
+    print(f'Rebuilt player totals ({len(drift)} player(s) corrected).')
+
+@bp.cli.command('close-season')
+@click.option('--next-name', help='次のシーズンの名前 (省略時は「シーズンN」)。')
+@click.option('--carry-over', is_flag=True, help='未消化の試合を次のシーズンに移す (省略時は未消化の試合があれば中止する)。')
+def close_season_command(next_name, carry_over):
+    """進行中のシーズンを終了し、順位表と選手成績をアーカイブに確定させて次のシーズンを始める。
+
+    試合とボックススコアは残り、終了したシーズンは /seasons/<id> で閲覧できる (以後は変更できない)。
+    """
+    try: season, next_season, moved = close_season(next_name, carry_over)
+    except ValueError as e: raise click.UsageError(str(e))
+    page_cache.bump_version()
+    print(f'Closed {season.name}; started {next_season.name}' + (f' with {moved} unfinished game(s) carried over.' if moved else '.'))
+
+@bp.cli.command('import-results')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='省略時は拡張子 (.csv / .jsonl) で判定する。')
+@click.option('--batch-size', type=int, help='1回にまとめて書き込む行数 (既定は IMPORT_BATCH_SIZE)。')
+def import_results_command(path, fmt, batch_size):
+    """ボックススコアの CSV / JSON lines ファイルを読み込み、試合結果として登録する。
+
+    ファイルに含まれる試合は、最初に出てきた時点で既存のボックススコアを置き換え、スコアを再計算する。
+    不正な行は読み飛ばして最後に一覧を表示し、1行でもあれば終了コード 1 を返す。
+    """
+    fmt = fmt or detect_format(path)
+    if fmt is None: raise click.UsageError('Cannot tell the file format from the extension; pass --format.')
+    with open(path, 'rb') as f: report = import_box_scores(f, fmt, batch_size)
+    page_cache.bump_version()
+    print(f'Imported {report.imported} row(s) for {len(report.game_ids)} game(s) from {report.rows} row(s); {report.error_count} error(s).')
+    for line, message in report.errors: print(f'  line {line}: {message}')
+    if report.error_count > len(report.errors): print(f'  ... and {report.error_count - len(report.errors)} more')
+    if report.error_count: sys.exit(1)
+
+@bp.cli.command('build-logo-variants')
+@click.option('--all', 'rebuild_all', is_flag=True, help='縮小版が既にあるチームも作り直す。')
+def build_logo_variants_command(rebuild_all):
+    """元画像から縮小版ロゴを作成する (移行前に登録されたロゴや、キャッシュの無い新しいサーバー向け)。"""
+    query = Team.query.filter(Team.logo_image.isnot(None))
+    if not rebuild_all: query = query.filter(Team.logo_version.is_(None))
+    failed = 0
+    for team_id, name in query.with_entities(Team.id, Team.name).all():
+        try: regenerate_logo_variants(team_id); print(f'{name}: OK')
+        except Exception as e:
+            db.session.rollback(); failed += 1; print(f'{name}: failed ({e})')
+    if failed: sys.exit(1)
+
+@bp.cli.command('export')
+@click.argument('kind', type=click.Choice(EXPORT_KINDS))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='出力先ファイル。省略すると標準出力 (parquet では必須)。')
+@click.option('--team-id', type=int)
+@click.option('--league')
+@click.option('--date-from', help='YYYY-MM-DD')
+@click.option('--date-to', help='YYYY-MM-DD')
+@click.option('--season', 'season_id', type=int, help='シーズンの ID (省略時は進行中のシーズン)。')
+def export_command(kind, fmt, output, team_id, league, date_from, date_to, season_id):
+    """選手のボックススコア・試合・順位表を CSV / JSON lines / Parquet に書き出す。
+
+    行は DB から少しずつ読みながら書き出すので、件数が多くてもメモリ使用量は一定。Parquet には pyarrow が必要。
+    """
+    dates = {}
+    for name, value in (('date_from', date_from), ('date_to', date_to)):
+        dates[name] = parse_game_date(value)
+        if value and dates[name] is None: raise click.BadParameter(f'{value!r} is not YYYY-MM-DD', param_hint=f'--{name.replace("_", "-")}')
+    try: statement = export_select(kind, team_id=team_id, league=league, season_id=season_id, **dates)
+    except ValueError as e: raise click.UsageError(str(e))
+    if fmt == 'parquet':
+        if not output: raise click.UsageError('--output is required for parquet')
+        try: write_parquet(statement, output)
+        except RuntimeError as e: raise click.ClickException(str(e))
+        return
+    columns, rows = stream_rows(statement)
+    with click.open_file(output or '-', 'w', encoding='utf-8', lazy=False) as f:
+        for chunk in (iter_csv(columns, rows) if fmt == 'csv' else iter_jsonl(columns, rows)): f.write(chunk)
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from tiebreakers import DEFAULT_TIEBREAKERS, parse_tiebreakers
+
+# --- 設定 (create_app から1回だけ読み込む) ---
+# 値はすべて環境変数から取る。ここでは外部サービスへの接続やライブラリの初期化は行わない
+# (DB のエンジンは最初のクエリ、Cloudinary は最初のアップロードのときに作る)。
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+def _int(name, default):
+    return int(os.environ[name]) if os.environ.get(name) else default
+
+def database_uri():
+    # DATABASE_URL (Cloud Run / Heroku 形式の postgres:// も可)。未設定ならローカル開発用の SQLite
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url: return database_url.replace('postgres://', 'postgresql://', 1)
+    return 'sqlite:///' + os.path.join(basedir, 'database.db')
+
+def load_config(config):
+    config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your_very_secret_key_change_it')
+    config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # ログイン中のユーザー (ID・ユーザー名・権限) をプロセス内に USER_CACHE_TTL 秒キャッシュし、リクエストごとの User の SELECT を省く。
+    # SESSION_USER_RECORD を有効にすると署名付きのセッションにも同じ内容を持たせ、TTL の間はキャッシュも見ない
+    config['USER_CACHE_TTL'] = _int('USER_CACHE_TTL', 60)
+    config['USER_CACHE_MAX_ENTRIES'] = _int('USER_CACHE_MAX_ENTRIES', 1024)
+    config['SESSION_USER_RECORD'] = os.environ.get('SESSION_USER_RECORD', '').lower() in ('1', 'true', 'yes')
+
+    # 公開ページのキャッシュ (memory / filesystem / sqlite)。複数ワーカーで共有する場合は filesystem か sqlite を使う
+    config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+    config['CACHE_DIR'] = os.environ.get('CACHE_DIR')
+    config['CACHE_SQLITE_PATH'] = os.environ.get('CACHE_SQLITE_PATH')
+    config['CACHE_TTL'] = _int('CACHE_TTL', 300)
+    config['CACHE_MAX_ENTRIES'] = _int('CACHE_MAX_ENTRIES', 256)
+
+    # 勝点が並んだときの順位の決め方 (左から順に比べる)。h2h_wins / h2h_diff / diff / points_for をカンマ区切りで
+    config['STANDINGS_TIEBREAKERS'] = parse_tiebreakers(os.environ.get('STANDINGS_TIEBREAKERS') or DEFAULT_TIEBREAKERS)
+
+    # スタッツリーダーの表示人数と規定 (LEADERS_MIN_GAMES 未設定時は最多出場試合数の半分)
+    config['LEADERS_TOP_N'] = _int('LEADERS_TOP_N', 5)
+    config['LEADERS_MIN_GAMES'] = _int('LEADERS_MIN_GAMES', None)
+    config['LEADERS_MIN_FGA'] = _int('LEADERS_MIN_FGA', 10)
+    config['LEADERS_MIN_3PA'] = _int('LEADERS_MIN_3PA', 5)
+    config['LEADERS_MIN_FTA'] = _int('LEADERS_MIN_FTA', 5)
+
+    # 日程ページの1ページあたりの試合数
+    config['SCHEDULE_PAGE_SIZE'] = _int('SCHEDULE_PAGE_SIZE', 50)
+    # 選手ページの試合ログの1ページあたりの試合数
+    config['PLAYER_LOG_PAGE_SIZE'] = _int('PLAYER_LOG_PAGE_SIZE', 20)
+
+    # 試合結果インポートで1回にまとめて書き込む行数
+    config['IMPORT_BATCH_SIZE'] = _int('IMPORT_BATCH_SIZE', 1000)
+
+    # チームロゴ: 元画像の保存先 (cloudinary / local)、縮小版のキャッシュ先、アップロード・削除を行うバックグラウンドジョブ
+    config['LOGO_STORAGE'] = os.environ.get('LOGO_STORAGE', 'cloudinary')
+    config['LOGO_STORAGE_DIR'] = os.environ.get('LOGO_STORAGE_DIR')
+    # 縮小版ロゴは元画像からいつでも作り直せるので、Cloud Run でも書き込める一時ディレクトリに置く
+    config['LOGO_CACHE_DIR'] = os.environ.get('LOGO_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'nba2k-logo-variants')
+    config['LOGO_JOB_WORKERS'] = _int('LOGO_JOB_WORKERS', 2)
+    config['LOGO_JOB_RETRIES'] = _int('LOGO_JOB_RETRIES', 3)
+    config['CLOUDINARY_CLOUD_NAME'] = os.environ.get('CLOUDINARY_CLOUD_NAME')
+    config['CLOUDINARY_API_KEY'] = os.environ.get('CLOUDINARY_API_KEY')
+    config['CLOUDINARY_API_SECRET'] = os.environ.get('CLOUDINARY_API_SECRET')
+
+    # ライブスコア (/live): SSE の同時接続数の上限 (gthread ではスレッド数より少なくする)、接続を閉じて張り直させるまでの秒数、
+    # キープアライブの間隔、上限を超えたクライアントのポーリング間隔、再接続時に遡れるイベント数
+    config['LIVE_MAX_SUBSCRIBERS'] = _int('LIVE_MAX_SUBSCRIBERS', 4)
+    config['LIVE_STREAM_SECONDS'] = _int('LIVE_STREAM_SECONDS', 300)
+    config['LIVE_HEARTBEAT_SECONDS'] = _int('LIVE_HEARTBEAT_SECONDS', 15)
+    config['LIVE_POLL_SECONDS'] = _int('LIVE_POLL_SECONDS', 10)
+    config['LIVE_BUFFER'] = _int('LIVE_BUFFER', 256)
+
+    # テスト時に SQL_STATEMENT_LIMIT (件数) を設定すると、上限を超える SQL を発行したページ表示を失敗させる
+    if os.environ.get('SQL_STATEMENT_LIMIT'): config['SQL_STATEMENT_LIMIT'] = int(os.environ['SQL_STATEMENT_LIMIT'])
+
+    # リクエストの計測: SLOW_REQUEST_MS 以上かかったリクエストをログに出す (空にすると出さない)。/metrics は Prometheus 形式で、
+    # METRICS_TOKEN が無ければ本番 (debug / テスト以外) では公開しない
+    config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 1000)) if os.environ.get('SLOW_REQUEST_MS') != '' else None
+    config['METRICS_SERVER_TIMING'] = os.environ.get('METRICS_SERVER_TIMING', '').lower() in ('1', 'true', 'yes')
+    config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    return config
@@ -0,0 +1,92 @@
+import io
+import csv
+import json
+from datetime import date, time
+from sqlalchemy import func, or_
+from sqlalchemy.orm import aliased
+from models import db, Team, Player, Game, PlayerStat, TeamStanding, SeasonStanding, STAT_FIELDS, STANDING_FIELDS
+from queries import filter_games, SCHEDULE_ORDER
+
+# --- シーズンデータのエクスポート (CSV / JSON lines / Parquet) ---
+# ORM のオブジェクトは作らず、Core の select を yield_per で少しずつ読み (Postgres ではサーバーサイドカーソル)、
+# 1行ずつ書き出す。行数によらずメモリ使用量は一定になる。
+
+EXPORT_KINDS = ('player_stats', 'games', 'standings')
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+MIMETYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+YIELD_PER = 1000
+
+def export_select(kind, team_id=None, league=None, date_from=None, date_to=None, season_id=None):
+    # 種類ごとの select を返す。season_id を省略すると進行中のシーズンの分。
+    # standings は保存済みのシーズン合計なので日付では絞り込めない (season_id を指定すると終了したシーズンのアーカイブを読む)
+    if kind == 'player_stats':
+        statement = (db.select(PlayerStat.game_id, Game.game_date, Game.start_time, PlayerStat.player_id, Player.name.label('player_name'),
+                               Player.team_id, Team.name.label('team_name'), Team.league, *[getattr(PlayerStat, field) for field in STAT_FIELDS])
+                     .join(Game, PlayerStat.game_id == Game.id).join(Player, PlayerStat.player_id == Player.id)
+                     .outerjoin(Team, Player.team_id == Team.id))
+        if team_id: statement = statement.where(Player.team_id == team_id)
+        if league: statement = statement.where(Team.league == league)
+        return filter_games(statement, date_from=date_from, date_to=date_to, season_id=season_id).order_by(*SCHEDULE_ORDER, PlayerStat.id)
+    if kind == 'games':
+        home, away = aliased(Team), aliased(Team)
+        statement = (db.select(Game.id, Game.game_date, Game.start_time, Game.home_team_id, home.name.label('home_team'),
+                               Game.away_team_id, away.name.label('away_team'), Game.home_score, Game.away_score,
+                               Game.is_finished, Game.winner_id, Game.loser_id)
+                     .outerjoin(home, Game.home_team_id == home.id).outerjoin(away, Game.away_team_id == away.id))
+        if league: statement = statement.where(or_(home.league == league, away.league == league))
+        return filter_games(statement, team_id=team_id, date_from=date_from, date_to=date_to, season_id=season_id).order_by(*SCHEDULE_ORDER)
+    if kind == 'standings':
+        if date_from or date_to: raise ValueError('standings cannot be filtered by date')
+        if season_id is not None:
+            statement = (db.select(SeasonStanding.team_id, SeasonStanding.team_name, SeasonStanding.league, SeasonStanding.overall_rank,
+                                   *[getattr(SeasonStanding, field) for field in STANDING_FIELDS]).where(SeasonStanding.season_id == season_id))
+            if team_id: statement = statement.where(SeasonStanding.team_id == team_id)
+            if league: statement = statement.where(SeasonStanding.league == league)
+            return statement.order_by(SeasonStanding.overall_rank)
+        statement = (db.select(Team.id.label('team_id'), Team.name.label('team_name'), Team.league,
+                               *[func.coalesce(getattr(TeamStanding, field), 0).label(field) for field in STANDING_FIELDS])
+                     .outerjoin(TeamStanding, TeamStanding.team_id == Team.id))
+        if team_id: statement = statement.where(Team.id == team_id)
+        if league: statement = statement.where(Team.league == league)
+        return statement.order_by(Team.id)
+    raise ValueError(f'Unknown export: {kind}')
+
+def stream_rows(statement):
+    # (列名のリスト, 行のイテレーター) を返す。ORM を通さず接続で直接実行する
+    result = db.session.connection().execute(statement.execution_options(yield_per=YIELD_PER))
+    return list(result.keys()), result
+
+def iter_csv(columns, rows):
+    # ヘッダー行のあと yield_per 行 (DB から1回に読む分) ごとに文字列をまとめて返す。日付・時刻は str() で ISO 形式になる
+    buffer = io.StringIO(); writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for partition in rows.partitions():
+        writer.writerows(partition)
+        yield buffer.getvalue(); buffer.seek(0); buffer.truncate()
+    if buffer.tell(): yield buffer.getvalue()
+
+def iter_jsonl(columns, rows):
+    for partition in rows.partitions():
+        lines = []
+        for row in partition:
+            lines.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_isoformat))
+        yield '\n'.join(lines) + '\n'
+
+def _isoformat(value):
+    if isinstance(value, (date, time)): return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def write_parquet(statement, destination, batch_rows=YIELD_PER * 10):
+    # pyarrow は任意の依存なので、Parquet を書くときにだけ読み込む。行グループ単位で書くのでメモリは batch_rows 行分
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)') from None
+    # 列の型は結果ではなく SQL の型から決める (最初の行グループが全て NULL でも型が変わらないように)
+    arrow_types = {int: pa.int64(), str: pa.string(), bool: pa.bool_(), date: pa.date32(), time: pa.time64('us')}
+    schema = pa.schema([(column.name, arrow_types.get(column.type.python_type, pa.string())) for column in statement.selected_columns])
+    columns, rows = stream_rows(statement)
+    with pq.ParquetWriter(destination, schema) as writer:
+        for partition in rows.partitions(batch_rows):
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in partition], schema=schema))
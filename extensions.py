@@ -0,0 +1,16 @@
+from flask import current_app
+from flask_login import LoginManager
+from werkzeug.local import LocalProxy
+
+# --- アプリごとのサービス ---
+# create_app が app.extensions に登録したものを、ブループリントやジョブからは現在のアプリ経由で参照する。
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.login_message = "このページにアクセスするにはログインが必要です。"
+
+page_cache = LocalProxy(lambda: current_app.extensions['page_cache'])
+logo_storage = LocalProxy(lambda: current_app.extensions['logo_storage'])
+logo_jobs = LocalProxy(lambda: current_app.extensions['logo_jobs'])
+user_cache = LocalProxy(lambda: current_app.extensions['user_cache'])
+live_updates = LocalProxy(lambda: current_app.extensions['live_updates'])
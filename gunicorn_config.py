@@ -1,2 +1,2 @@
 # Gunicornのタイムアウト設定
-timeout = 180  # タイムアウトを120秒（2分）に延長
\ No newline at end of file
+timeout = 60  # ロゴのアップロードはバックグラウンドのジョブで行うため、既定に近い値に戻した
@@ -0,0 +1,66 @@
+import hashlib
+from datetime import time
+from functools import wraps
+from flask import request, redirect, url_for, flash, session, make_response, g, has_request_context
+from flask_login import current_user
+from sqlalchemy import event
+from extensions import page_cache
+from models import db
+
+# --- ブループリント共通の権限管理とヘルパー関数 ---
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            flash("この操作には管理者権限が必要です。"); return redirect(url_for('public.index'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def cached_page(*arg_names):
+    # 未ログインの閲覧者向けに「ルート + パスの値 + 指定したクエリ引数 + データバージョン」でレンダリング結果を使い回す
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # ログイン中のユーザーやフラッシュメッセージがある場合は画面の内容が変わるのでキャッシュしない
+            if current_user.is_authenticated or session.get('_flashes'): return f(*args, **kwargs)
+            # URL のパス中の値 (/seasons/<season_id> など) も必ずキーに含める
+            key = '|'.join([page_cache.get_version(), request.endpoint] + [f'{name}={value}' for name, value in sorted((request.view_args or {}).items())]
+                           + [f'{name}={request.args.get(name, "")}' for name in arg_names])
+            etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                cached = page_cache.get(key)
+                if cached is None:
+                    rendered = make_response(f(*args, **kwargs))
+                    if rendered.status_code != 200: return rendered
+                    cached = (rendered.get_data(as_text=True), rendered.mimetype)
+                    page_cache.set(key, cached)
+                response = make_response(cached[0]); response.mimetype = cached[1]
+            response.set_etag(etag); response.cache_control.no_cache = True; response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
+
+@event.listens_for(db.session, 'after_commit')
+def _mark_committed(session):
+    # リクエスト中に実際にコミットしたかを覚えておく (invalidates_cache が見る)
+    if has_request_context(): g.data_committed = True
+
+def invalidates_cache(f):
+    # データを書き換えるルートに付ける。POST の処理中にコミットがあったときだけデータバージョンを進めてキャッシュを無効化する
+    # (未ログイン・権限なし・入力エラー・古い版での保存など、何も書き込まずに戻ったリクエストではキャッシュを捨てない)
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = f(*args, **kwargs)
+        if request.method == 'POST' and g.pop('data_committed', False): page_cache.bump_version()
+        return response
+    return decorated_function
+
+def format_start_time(value):
+    # テンプレートの |hhmm フィルター
+    return value.strftime('%H:%M') if isinstance(value, time) else (value or '')
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif'}
@@ -0,0 +1,91 @@
+import io
+import os
+import csv
+import json
+from queries import in_season
+from models import db, Player, Game, STAT_FIELDS
+
+# --- 試合結果 (ボックススコア) の一括インポート ---
+# 1行 = 1試合の1選手分 (game_id, player_id, [team_id], pts, ast, ...)。CSV (ヘッダー行あり) か JSON lines を受け付ける。
+# ファイルは1行ずつ読み、検証済みの行を batch_size 件ずつまとめて返すので、ファイルの大きさによらずメモリは一定。
+# 不正な行はエラーとして記録して読み飛ばし、ファイル全体は止めない。
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 200
+# (成功数, 試投数) の組。成功数が試投数を超える行は入力ミスとして弾く
+MADE_ATTEMPTED = (('fgm', 'fga'), ('three_pm', 'three_pa'), ('ftm', 'fta'), ('three_pm', 'fgm'))
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0; self.imported = 0; self.game_ids = set(); self.error_count = 0; self.errors = []
+
+    def add_error(self, line, message):
+        # 件数は全て数え、内容は先頭 MAX_REPORTED_ERRORS 件だけ残す
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS: self.errors.append((line, message))
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.csv': return 'csv'
+    if extension in ('.jsonl', '.ndjson', '.json'): return 'jsonl'
+    return None
+
+def read_rows(stream, fmt):
+    # (行番号, dict) を1行ずつ返す。stream はバイナリでもテキストでもよい
+    text = stream if isinstance(stream, io.TextIOBase) else io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader: yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text, start=1):
+            if not line.strip(): continue
+            try: row = json.loads(line)
+            except ValueError: row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f'Unknown import format: {fmt}')
+
+def load_lookup():
+    # 検証用に全選手の所属チームと、進行中のシーズンの試合の対戦カードを先に読み込んでおく (ID だけなので小さい)
+    # 終了したシーズンの試合は成績をアーカイブ済みなので、インポートでは変更できない
+    players = dict(db.session.query(Player.id, Player.team_id).all())
+    games = {game_id: (home, away) for game_id, home, away in db.session.query(Game.id, Game.home_team_id, Game.away_team_id).filter(in_season())}
+    return players, games
+
+def _to_int(row, field, required=False):
+    value = row.get(field)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required: raise ValueError(f'{field} がありません')
+        return 0
+    try: number = int(value)
+    except (TypeError, ValueError): raise ValueError(f'{field} が整数ではありません: {value!r}') from None
+    if number < 0: raise ValueError(f'{field} が負の値です: {number}')
+    return number
+
+def validate_row(row, players, games):
+    # PlayerStat に INSERT できる dict を返す。不正なら ValueError
+    if row is None: raise ValueError('行を読み取れません')
+    game_id = _to_int(row, 'game_id', required=True); player_id = _to_int(row, 'player_id', required=True)
+    if game_id not in games: raise ValueError(f'試合 {game_id} は存在しないか、終了したシーズンの試合です')
+    if player_id not in players: raise ValueError(f'選手 {player_id} は存在しません')
+    if players[player_id] not in games[game_id]: raise ValueError(f'選手 {player_id} は試合 {game_id} のどちらのチームにも所属していません')
+    if row.get('team_id') not in (None, '') and _to_int(row, 'team_id') != players[player_id]:
+        raise ValueError(f'選手 {player_id} の所属チームが team_id と一致しません')
+    stat = {'game_id': game_id, 'player_id': player_id, **{field: _to_int(row, field) for field in STAT_FIELDS}}
+    for made, attempted in MADE_ATTEMPTED:
+        if stat[made] > stat[attempted]: raise ValueError(f'{made} ({stat[made]}) が {attempted} ({stat[attempted]}) を超えています')
+    return stat
+
+def validated_batches(stream, fmt, report, batch_size=1000):
+    # 検証を通った行を最大 batch_size 件ずつのリストで返す。同じバッチ内で同じ選手・試合が重複したら後の行を使う
+    players, games = load_lookup()
+    batch = {}
+    for line, row in read_rows(stream, fmt):
+        report.rows += 1
+        try: stat = validate_row(row, players, games)
+        except ValueError as e:
+            report.add_error(line, str(e)); continue
+        batch[(stat['game_id'], stat['player_id'])] = stat
+        if len(batch) >= batch_size:
+            yield list(batch.values()); batch = {}
+    if batch: yield list(batch.values())
@@ -0,0 +1,125 @@
+import time
+import heapq
+import threading
+from collections import defaultdict
+from flask import g, request, has_request_context, before_render_template, template_rendered, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- リクエストごとの計測 (SQL・テンプレート描画・全体の時間) と Prometheus 形式の /metrics ---
+# SQL の件数は queries.py の g.sql_statement_count を使い、ここでは時間と遅い SQL を記録する。
+# 集計はプロセス内に持つので、gunicorn のワーカーが複数のときはワーカーごとの値になる。
+# ストリーミングで返すレスポンス (エクスポート) は本文を書き出す前までの時間になる。
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOWEST_STATEMENTS = 5
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    # 開始時刻は文ごとの context に持たせる (例外で after_cursor_execute が呼ばれなくても、次の文の計測にずれが残らない)
+    if has_request_context(): context._query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    if not has_request_context() or started is None: return
+    elapsed = time.perf_counter() - started
+    g.sql_time = g.get('sql_time', 0.0) + elapsed
+    # 遅い順に SLOWEST_STATEMENTS 件だけ残す (最小ヒープ)
+    slowest = g.setdefault('sql_slowest', [])
+    entry = (elapsed, ' '.join(statement.split()))
+    if len(slowest) < SLOWEST_STATEMENTS: heapq.heappush(slowest, entry)
+    elif entry > slowest[0]: heapq.heapreplace(slowest, entry)
+
+def _start_render(sender, template, context, **extra):
+    g.setdefault('render_started', []).append(time.perf_counter())
+
+def _finish_render(sender, template, context, **extra):
+    started = g.get('render_started')
+    if not started: return
+    elapsed = time.perf_counter() - started.pop()
+    # extends / include は別の描画として通知されないので、render_template 1回 = 1回の計測になる
+    if not started: g.render_time = g.get('render_time', 0.0) + elapsed
+
+
+class RequestMetrics:
+    # エンドポイントごとのレイテンシのヒストグラムと、SQL 件数・DB 時間・描画時間の合計
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets; self._lock = threading.Lock()
+        self._latency = defaultdict(lambda: [0] * (len(buckets) + 1))
+        self._totals = defaultdict(lambda: dict.fromkeys(('count', 'seconds', 'statements', 'db_seconds', 'render_seconds'), 0))
+        self._status = defaultdict(int)
+
+    def observe(self, endpoint, status, seconds, statements, db_seconds, render_seconds):
+        with self._lock:
+            counts = self._latency[endpoint]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound: counts[i] += 1
+            counts[-1] += 1
+            totals = self._totals[endpoint]
+            totals['count'] += 1; totals['seconds'] += seconds; totals['statements'] += statements
+            totals['db_seconds'] += db_seconds; totals['render_seconds'] += render_seconds
+            self._status[(endpoint, status)] += 1
+
+    def render(self):
+        # Prometheus のテキスト形式 (version 0.0.4)
+        with self._lock:
+            latency = {endpoint: list(counts) for endpoint, counts in self._latency.items()}
+            totals = {endpoint: dict(values) for endpoint, values in self._totals.items()}
+            status = dict(self._status)
+        lines = ['# HELP flask_request_duration_seconds Request latency by endpoint.',
+                 '# TYPE flask_request_duration_seconds histogram']
+        for endpoint, counts in sorted(latency.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'flask_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'flask_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {counts[-1]}')
+            lines.append(f'flask_request_duration_seconds_sum{{endpoint="{endpoint}"}} {totals[endpoint]["seconds"]:.6f}')
+            lines.append(f'flask_request_duration_seconds_count{{endpoint="{endpoint}"}} {counts[-1]}')
+        for name, key, help_text in (('flask_request_sql_statements_total', 'statements', 'SQL statements issued while handling requests.'),
+                                     ('flask_request_db_seconds_total', 'db_seconds', 'Time spent executing SQL while handling requests.'),
+                                     ('flask_request_render_seconds_total', 'render_seconds', 'Time spent rendering templates.')):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{endpoint="{endpoint}"}} {values[key]:.6g}' for endpoint, values in sorted(totals.items())]
+        lines += ['# HELP flask_requests_total Requests by endpoint and status code.', '# TYPE flask_requests_total counter']
+        lines += [f'flask_requests_total{{endpoint="{endpoint}",status="{code}"}} {count}' for (endpoint, code), count in sorted(status.items())]
+        return '\n'.join(lines) + '\n'
+
+
+def init_instrumentation(app):
+    # SLOW_REQUEST_MS を超えたリクエストを内訳と遅い SQL 付きでログに出す。
+    # METRICS_SERVER_TIMING を有効にすると Server-Timing ヘッダーで内訳を返す (ブラウザの開発者ツールで見られる)。
+    # /metrics は METRICS_TOKEN を設定して Authorization: Bearer <token> で読む。未設定なら debug / テスト時以外は 403
+    metrics = RequestMetrics()
+    before_render_template.connect(_start_render, app); template_rendered.connect(_finish_render, app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('request_started')
+        if started is None: return response
+        seconds = time.perf_counter() - started
+        endpoint = request.endpoint or 'unknown'
+        statements = g.get('sql_statement_count', 0); db_seconds = g.get('sql_time', 0.0); render_seconds = g.get('render_time', 0.0)
+        metrics.observe(endpoint, response.status_code, seconds, statements, db_seconds, render_seconds)
+        slow_ms = app.config.get('SLOW_REQUEST_MS')
+        if slow_ms is not None and seconds * 1000 >= slow_ms:
+            slowest = ''.join(f'\n    {elapsed * 1000:8.1f} ms  {statement[:300]}' for elapsed, statement in sorted(g.get('sql_slowest', []), reverse=True))
+            app.logger.warning('slow request %s %s (%s): %.1f ms total, %d SQL in %.1f ms, render %.1f ms%s',
+                               request.method, request.full_path.rstrip('?'), endpoint, seconds * 1000, statements,
+                               db_seconds * 1000, render_seconds * 1000, slowest)
+        if app.config.get('METRICS_SERVER_TIMING'):
+            response.headers['Server-Timing'] = (f'db;dur={db_seconds * 1000:.1f};desc="{statements} SQL", '
+                                                 f'render;dur={render_seconds * 1000:.1f}, app;dur={seconds * 1000:.1f}')
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token and not (app.debug or app.testing): return Response('forbidden (set METRICS_TOKEN)\n', status=403, mimetype='text/plain')
+        if token and request.headers.get('Authorization') != f'Bearer {token}': return Response('unauthorized\n', status=401, mimetype='text/plain')
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
@@ -0,0 +1,335 @@
+import time
+import threading
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import func, case, or_, union_all, tuple_
+from importer import ImportReport, validated_batches
+from extensions import page_cache
+from tiebreakers import build_results_matrix, rank_standings
+from queries import in_season
+from models import db, Team, Player, Game, PlayerStat, Season, TeamStanding, PlayerSeasonTotals, STANDING_FIELDS, STAT_FIELDS, PLAYER_TOTAL_FIELDS
+
+# --- 順位表・選手通算成績 (集計テーブル) とスタッツリーダー ---
+# 試合結果を書き込むルート・コマンドは、書き込み前後の寄与の差分を集計テーブルに反映する。
+# 集計テーブルは進行中のシーズンの分だけを持つ (終了したシーズンの分は seasons.py のアーカイブにある)。
+
+def current_season_id():
+    # 試合を登録するときのシーズン。まだシーズンが1つも無ければ最初のシーズンを作る (コミットは呼び出し側)
+    season_id = db.session.query(Season.id).filter(Season.is_active == True).scalar()
+    if season_id is None:
+        season = Season(name=f'シーズン{Season.query.count() + 1}', is_active=True)
+        db.session.add(season); db.session.flush(); season_id = season.id
+    return season_id
+
+def season_game_ids(season_id=None):
+    # 進行中 (または指定した) シーズンの試合 ID のサブクエリ
+    return db.select(Game.id).where(in_season(season_id))
+
+def aggregate_standings_totals(*criteria):
+    # 終了済みの試合をホーム視点・アウェイ視点の行に展開し、1回の集計クエリで全チーム分を計算する
+    # (criteria で対象の試合を絞り込める)
+    home_rows = db.select(Game.home_team_id.label('team_id'), Game.home_score.label('pf'), Game.away_score.label('pa'),
+                          Game.winner_id, Game.loser_id).where(Game.is_finished == True, *criteria)
+    away_rows = db.select(Game.away_team_id.label('team_id'), Game.away_score.label('pf'), Game.home_score.label('pa'),
+                          Game.winner_id, Game.loser_id).where(Game.is_finished == True, *criteria)
+    rows = union_all(home_rows, away_rows).subquery()
+    # 不戦勝/不戦敗 (winner_id/loser_id あり) は勝敗のみ数え、得失点・平均の対象外
+    is_normal = rows.c.winner_id.is_(None)
+    totals = db.select(
+        rows.c.team_id,
+        func.sum(case((rows.c.winner_id == rows.c.team_id, 1), (rows.c.loser_id == rows.c.team_id, 0), (rows.c.pf > rows.c.pa, 1), else_=0)).label('wins'),
+        func.sum(case((rows.c.winner_id == rows.c.team_id, 0), (rows.c.loser_id == rows.c.team_id, 1), (rows.c.pf < rows.c.pa, 1), else_=0)).label('losses'),
+        func.sum(case((is_normal, rows.c.pf), else_=0)).label('points_for'),
+        func.sum(case((is_normal, rows.c.pa), else_=0)).label('points_against'),
+        func.sum(case((is_normal, 1), else_=0)).label('stats_games_played')
+    ).group_by(rows.c.team_id).subquery()
+    results = db.session.query(
+        Team.id, totals.c.wins, totals.c.losses, totals.c.points_for, totals.c.points_against, totals.c.stats_games_played
+    ).outerjoin(totals, totals.c.team_id == Team.id).all()
+    standings = {}
+    for team_id, wins, losses, points_for, points_against, stats_games_played in results:
+        wins, losses = wins or 0, losses or 0
+        standings[team_id] = {'wins': wins, 'losses': losses, 'points': (wins * 2) + (losses * 1),
+                              'points_for': points_for or 0, 'points_against': points_against or 0,
+                              'stats_games_played': stats_games_played or 0}
+    return standings
+
+def game_standing_contribution(game):
+    # 1試合が順位表に与える寄与 {team_id: {項目: 値}}。未終了の試合は何も寄与しない
+    if not game.is_finished: return {}
+    contribution = {}
+    for team_id, pf, pa in ((game.home_team_id, game.home_score or 0, game.away_score or 0),
+                            (game.away_team_id, game.away_score or 0, game.home_score or 0)):
+        if game.winner_id == team_id: wins, losses = 1, 0
+        elif game.loser_id == team_id: wins, losses = 0, 1
+        elif pf > pa: wins, losses = 1, 0
+        elif pf < pa: wins, losses = 0, 1
+        else: wins, losses = 0, 0
+        is_normal = game.winner_id is None
+        contribution[team_id] = {'wins': wins, 'losses': losses, 'points': (wins * 2) + (losses * 1),
+                                 'points_for': pf if is_normal else 0, 'points_against': pa if is_normal else 0,
+                                 'stats_games_played': 1 if is_normal else 0}
+    return contribution
+
+def apply_rollup_delta(model, key_column, fields, before, after):
+    # 書き込み前後の寄与の差分だけを集計テーブルに加算する (コミットは呼び出し側のトランザクションで行う)
+    for key in set(before) | set(after):
+        delta = {field: after.get(key, {}).get(field, 0) - before.get(key, {}).get(field, 0) for field in fields}
+        if not any(delta.values()): continue
+        result = db.session.execute(db.update(model).where(key_column == key).values(
+            {getattr(model, field): getattr(model, field) + value for field, value in delta.items()}))
+        if result.rowcount == 0: db.session.add(model(**{key_column.key: key}, **delta))
+
+def rebuild_rollup(model, key_column, fields, expected):
+    # 集計テーブルを expected の内容で作り直し、作り直す前との差分 (ドリフト) を返す
+    stored = {getattr(row, key_column.key): row for row in model.query.all()}
+    drift = []
+    for key, values in expected.items():
+        row = stored.pop(key, None)
+        current = {field: getattr(row, field) for field in fields} if row else dict.fromkeys(fields, 0)
+        if current != values: drift.append((key, current, values))
+        if row:
+            for field, value in values.items(): setattr(row, field, value)
+        else: db.session.add(model(**{key_column.key: key}, **values))
+    for key, row in stored.items():
+        current = {field: getattr(row, field) for field in fields}
+        if any(current.values()): drift.append((key, current, dict.fromkeys(fields, 0)))
+        db.session.delete(row)
+    return drift
+
+def apply_standing_delta(before, after):
+    apply_rollup_delta(TeamStanding, TeamStanding.team_id, STANDING_FIELDS, before, after)
+
+def rebuild_standings():
+    # 進行中のシーズンの試合から TeamStanding を作り直す
+    return rebuild_rollup(TeamStanding, TeamStanding.team_id, STANDING_FIELDS, aggregate_standings_totals(in_season()))
+
+def aggregate_player_totals(*criteria):
+    # PlayerStat を選手ごとに1回の GROUP BY で集計する (criteria で対象の試合などを絞り込める)
+    results = db.session.query(
+        PlayerStat.player_id, func.count(PlayerStat.id), *[func.sum(getattr(PlayerStat, field)) for field in STAT_FIELDS]
+    ).join(Player, PlayerStat.player_id == Player.id).filter(*criteria).group_by(PlayerStat.player_id).all()
+    return {row[0]: dict(zip(PLAYER_TOTAL_FIELDS, [value or 0 for value in row[1:]])) for row in results}
+
+def player_stat_contribution(stats):
+    # PlayerStat の行 (保存前のオブジェクトも可) が選手の通算成績に与える寄与
+    return box_score_contribution((stat.player_id, {field: getattr(stat, field) or 0 for field in STAT_FIELDS}) for stat in stats)
+
+def box_score_contribution(rows):
+    # [(選手ID, {項目: 値})] が選手の通算成績に与える寄与 {選手ID: {games_played と各項目の合計}}
+    total = defaultdict(lambda: dict.fromkeys(PLAYER_TOTAL_FIELDS, 0))
+    for player_id, values in rows:
+        total[player_id]['games_played'] += 1
+        for field in STAT_FIELDS: total[player_id][field] += values[field]
+    return dict(total)
+
+def apply_player_totals_delta(before, after):
+    apply_rollup_delta(PlayerSeasonTotals, PlayerSeasonTotals.player_id, PLAYER_TOTAL_FIELDS, before, after)
+
+def rebuild_player_totals():
+    # 進行中のシーズンの PlayerStat から PlayerSeasonTotals を作り直す
+    return rebuild_rollup(PlayerSeasonTotals, PlayerSeasonTotals.player_id, PLAYER_TOTAL_FIELDS,
+                          aggregate_player_totals(PlayerStat.game_id.in_(season_game_ids())))
+
+# --- 試合結果の保存 (edit_game・不戦勝) ---
+# 送られたボックススコアを保存済みの行と比べ、変わった選手の行だけを一括の INSERT / UPDATE / DELETE で書き込む。
+# 戻り値の変更記録 {選手ID: [前の寄与 or None, 後の寄与 or None]} は選手の通算成績への寄与の形なので、
+# apply_box_score_change でそのまま集計テーブルに反映でき、ライブスコアの差分にも使える。
+# 同じ試合・同じ選手の行は1つだけ (edit_game・インポートとも選手ごとに置き換える) で、重複があれば1行に直す。
+
+def claim_game_version(game_id, expected):
+    # 楽観的排他: 編集画面を開いたときの版 (expected) のままなら版を1つ進めて True、他の保存が先に済んでいれば False。
+    # 最初に試合の行を UPDATE するので、同じ試合の同時保存はここで直列になる
+    result = db.session.execute(db.update(Game).where(Game.id == game_id, func.coalesce(Game.version, 0) == expected).values(
+        version=func.coalesce(Game.version, 0) + 1).execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+def write_box_score(game_id, submitted):
+    # submitted: {選手ID: {項目: 値}} (その試合に出場した全選手分)。変更記録を返す (コミットは呼び出し側)
+    stored = db.session.query(PlayerStat.id, PlayerStat.player_id, *[getattr(PlayerStat, field) for field in STAT_FIELDS]).filter(
+        PlayerStat.game_id == game_id).all()
+    rows_by_player = defaultdict(list)
+    for row in stored: rows_by_player[row.player_id].append(row)
+    inserts, updates, delete_ids, change = [], [], [], {}
+    for player_id in set(rows_by_player) | set(submitted):
+        rows = rows_by_player.get(player_id, [])
+        values = {field: submitted[player_id].get(field) or 0 for field in STAT_FIELDS} if player_id in submitted else None
+        before = box_score_contribution((player_id, {field: getattr(row, field) or 0 for field in STAT_FIELDS}) for row in rows).get(player_id)
+        after = box_score_contribution([(player_id, values)])[player_id] if values is not None else None
+        if before == after: continue
+        change[player_id] = [before, after]
+        if values is None or len(rows) > 1:
+            delete_ids.extend(row.id for row in rows); rows = []
+        if values is None: continue
+        if rows: updates.append({'id': rows[0].id, **values})
+        else: inserts.append({'game_id': game_id, 'player_id': player_id, **values})
+    if delete_ids: PlayerStat.query.filter(PlayerStat.id.in_(delete_ids)).delete(synchronize_session=False)
+    if updates: db.session.execute(db.update(PlayerStat), updates)
+    if inserts: db.session.execute(db.insert(PlayerStat), inserts)
+    return change
+
+def apply_box_score_change(change):
+    # write_box_score の変更記録を選手の通算成績に反映する
+    apply_player_totals_delta({player_id: before for player_id, (before, _) in change.items() if before},
+                              {player_id: after for player_id, (_, after) in change.items() if after})
+
+def roster_score(team_id_column):
+    # 試合のボックススコアのうち、そのチームに所属する選手の得点の合計 (インポート・選手やチームの削除でスコアを数え直すときの規則)
+    return (db.select(func.coalesce(func.sum(PlayerStat.pts), 0)).join(Player, PlayerStat.player_id == Player.id)
+            .where(PlayerStat.game_id == Game.id, Player.team_id == team_id_column).scalar_subquery())
+
+def recount_game_scores(game_ids):
+    # ボックススコアの行を消した試合 (終了済み・不戦勝以外) のスコアを数え直し、順位表に差分を反映する。版も進める
+    game_ids = list(game_ids)
+    if not game_ids: return
+    counted = (Game.id.in_(game_ids), Game.winner_id.is_(None))
+    standings_before = aggregate_standings_totals(*counted)
+    Game.query.filter(Game.is_finished == True, *counted).update(
+        {Game.home_score: roster_score(Game.home_team_id), Game.away_score: roster_score(Game.away_team_id),
+         Game.version: func.coalesce(Game.version, 0) + 1}, synchronize_session=False)
+    apply_standing_delta(standings_before, aggregate_standings_totals(*counted))
+
+def apply_box_score_batch(stats, new_game_ids):
+    # インポートの1バッチ分を書き込む。new_game_ids (このインポートで初めて出てきた試合) は既存のボックススコアを全て置き換え、
+    # それ以外の試合は同じ選手の行だけを置き換える。試合のスコアと集計テーブルも同じトランザクションで更新する
+    game_ids = {stat['game_id'] for stat in stats}
+    replaced = or_(PlayerStat.game_id.in_(new_game_ids),
+                   tuple_(PlayerStat.game_id, PlayerStat.player_id).in_([(stat['game_id'], stat['player_id']) for stat in stats]))
+    standings_before = aggregate_standings_totals(Game.id.in_(game_ids)); totals_before = aggregate_player_totals(replaced)
+    PlayerStat.query.filter(replaced).delete(synchronize_session=False)
+    db.session.execute(db.insert(PlayerStat), stats)
+    Game.query.filter(Game.id.in_(game_ids)).update(
+        {Game.home_score: roster_score(Game.home_team_id), Game.away_score: roster_score(Game.away_team_id),
+         Game.is_finished: True, Game.winner_id: None, Game.loser_id: None, Game.version: func.coalesce(Game.version, 0) + 1},
+        synchronize_session=False)
+    apply_standing_delta(standings_before, aggregate_standings_totals(Game.id.in_(game_ids)))
+    apply_player_totals_delta(totals_before, aggregate_player_totals(replaced))
+
+def import_box_scores(stream, fmt, batch_size=None):
+    # ファイルを1行ずつ読み、検証済みの行をバッチごとに書き込んでコミットする。不正な行は report.errors に残して続ける
+    report = ImportReport()
+    for stats in validated_batches(stream, fmt, report, batch_size or current_app.config['IMPORT_BATCH_SIZE']):
+        new_game_ids = {stat['game_id'] for stat in stats} - report.game_ids
+        apply_box_score_batch(stats, new_game_ids); db.session.commit()
+        report.game_ids |= new_game_ids; report.imported += len(stats)
+    return report
+
+# 直接対決の対戦成績表はデータバージョンごとに1つだけ保持し、CACHE_TTL 秒で捨てる (順位表のページキャッシュと同じ単位で作り直す。
+# メモリのキャッシュのバージョンはプロセスごとなので、CLI や他のワーカーの書き込みは TTL の間だけ遅れて反映される)
+_matrix_memo = {}
+_matrix_lock = threading.Lock()
+
+def load_results_matrix():
+    # 進行中のシーズンの終了済みの試合を1回のクエリで読み、チーム x 相手の対戦成績表を作る
+    games = db.session.query(Game.home_team_id, Game.away_team_id, Game.home_score, Game.away_score, Game.winner_id, Game.loser_id).filter(
+        in_season(), Game.is_finished == True).all()
+    return build_results_matrix(games)
+
+def results_matrix(version):
+    now = time.monotonic()
+    with _matrix_lock:
+        if _matrix_memo.get('version') == version and _matrix_memo['expires'] > now: return _matrix_memo['matrix']
+    matrix = load_results_matrix()
+    with _matrix_lock: _matrix_memo.update(version=version, matrix=matrix, expires=now + current_app.config['CACHE_TTL'])
+    return matrix
+
+def calculate_all_standings(matrix=None):
+    # 保存済みの TeamStanding を1回読み、勝点 → STANDINGS_TIEBREAKERS の順で総合・リーグ別の順位表を組み立てる
+    # matrix を渡さなければ、現在のデータバージョンの対戦成績表を使う (書き込み直後でバージョンが古いときは load_results_matrix() を渡す)
+    if matrix is None: matrix = results_matrix(page_cache.get_version())
+    chain = current_app.config['STANDINGS_TIEBREAKERS']
+    results = db.session.query(Team, TeamStanding).outerjoin(TeamStanding, TeamStanding.team_id == Team.id).order_by(Team.id).all()
+    rows = [{'team': team, 'team_id': team.id, 'team_name': team.name, 'league': team.league, **standing_row(standing)} for team, standing in results]
+    overall = rank_standings(rows, matrix, chain)
+    # リーグ別の順位表は、そのリーグのチームだけで直接対決を比べるので、リーグごとに並べ直す
+    teams_by_league = defaultdict(list)
+    for row in rows: teams_by_league[row['league']].append(row)
+    by_league = defaultdict(list, {league: rank_standings(league_rows, matrix, chain) for league, league_rows in teams_by_league.items()})
+    return overall, by_league
+
+def standing_row(standing):
+    # 順位表の1行分の値 (TeamStanding が無いチームは全て 0)
+    values = {field: getattr(standing, field) for field in STANDING_FIELDS} if standing else dict.fromkeys(STANDING_FIELDS, 0)
+    stats_games_played = values['stats_games_played']
+    return {'wins': values['wins'], 'losses': values['losses'], 'points': values['points'],
+            'avg_pf': round(values['points_for'] / stats_games_played, 1) if stats_games_played > 0 else 0,
+            'avg_pa': round(values['points_against'] / stats_games_played, 1) if stats_games_played > 0 else 0,
+            'diff': values['points_for'] - values['points_against'], 'points_for': values['points_for'],
+            'stats_games_played': stats_games_played}
+
+def calculate_standings(league_filter=None):
+    overall, by_league = calculate_all_standings()
+    return by_league.get(league_filter, []) if league_filter else overall
+
+# スタッツリーダーの部門: (表示名, 値の計算, 規定の試投数の列, 規定試投数の設定名)
+LEADER_CATEGORIES = [
+    ('平均得点', lambda t: t.pts / t.games_played, None, None),
+    ('平均アシスト', lambda t: t.ast / t.games_played, None, None),
+    ('平均リバウンド', lambda t: t.reb / t.games_played, None, None),
+    ('平均スティール', lambda t: t.stl / t.games_played, None, None),
+    ('平均ブロック', lambda t: t.blk / t.games_played, None, None),
+    ('平均TO', lambda t: t.turnover / t.games_played, None, None),
+    ('平均ファウル', lambda t: t.foul / t.games_played, None, None),
+    ('FG%', lambda t: t.fgm * 100.0 / t.fga, 'fga', 'LEADERS_MIN_FGA'),
+    ('3P%', lambda t: t.three_pm * 100.0 / t.three_pa, 'three_pa', 'LEADERS_MIN_3PA'),
+    ('FT%', lambda t: t.ftm * 100.0 / t.fta, 'fta', 'LEADERS_MIN_FTA'),
+    ('平均EFF', lambda t: (t.pts + t.reb + t.ast + t.stl + t.blk - (t.fga - t.fgm) - (t.fta - t.ftm) - t.turnover) / t.games_played, None, None),
+]
+
+def get_stats_leaders(top_n=None):
+    # PlayerSeasonTotals を1回読むだけで全部門の上位 N 人を決める
+    rows = db.session.query(Player.id, Player.name, PlayerSeasonTotals).join(
+        PlayerSeasonTotals, PlayerSeasonTotals.player_id == Player.id).filter(PlayerSeasonTotals.games_played > 0).all()
+    return rank_leaders(rows, top_n)
+
+def rank_leaders(rows, top_n=None):
+    # rows: [(選手ID, 選手名, 通算成績)]。通算成績は PlayerSeasonTotals と同じ属性を持つもの (アーカイブの SeasonPlayerTotals も可)
+    top_n = top_n or current_app.config['LEADERS_TOP_N']
+    # 規定試合数: 未設定なら最多出場試合数の半分 (切り上げ)
+    min_games = current_app.config['LEADERS_MIN_GAMES']
+    if min_games is None: min_games = -(-max((totals.games_played for _, _, totals in rows), default=0) // 2)
+    qualified = [row for row in rows if row[2].games_played >= min_games]
+    leaders = {}
+    for category_name, value_of, attempts_field, min_attempts_key in LEADER_CATEGORIES:
+        ranked = []
+        for player_id, player_name, totals in qualified:
+            if attempts_field and getattr(totals, attempts_field) < max(current_app.config[min_attempts_key], 1): continue
+            ranked.append((value_of(totals), totals.games_played, player_name, player_id))
+        # 同じ値なら出場試合数の多い順、さらに名前・ID順で常に同じ並びにする
+        ranked.sort(key=lambda r: (-r[0], -r[1], r[2], r[3]))
+        leaders[category_name] = [(player_name, value) for value, _, player_name, _ in ranked[:top_n]]
+    return leaders
+
+def calculate_team_stats():
+    team_stats_list = []
+    standings_info = calculate_standings()
+    shooting_stats_query = db.session.query(
+        Player.team_id, func.sum(PlayerSeasonTotals.pts).label('total_pts'),
+        func.sum(PlayerSeasonTotals.ast).label('total_ast'), func.sum(PlayerSeasonTotals.reb).label('total_reb'),
+        func.sum(PlayerSeasonTotals.stl).label('total_stl'), func.sum(PlayerSeasonTotals.blk).label('total_blk'),
+        func.sum(PlayerSeasonTotals.foul).label('total_foul'), func.sum(PlayerSeasonTotals.turnover).label('total_turnover'),
+        func.sum(PlayerSeasonTotals.fgm).label('total_fgm'), func.sum(PlayerSeasonTotals.fga).label('total_fga'),
+        func.sum(PlayerSeasonTotals.three_pm).label('total_3pm'), func.sum(PlayerSeasonTotals.three_pa).label('total_3pa'),
+        func.sum(PlayerSeasonTotals.ftm).label('total_ftm'), func.sum(PlayerSeasonTotals.fta).label('total_fta')
+    ).join(Player, PlayerSeasonTotals.player_id == Player.id).group_by(Player.team_id).all()
+    shooting_map = {s.team_id: s for s in shooting_stats_query}
+    for team_standings in standings_info:
+        team_obj = team_standings.get('team')
+        if not team_obj: continue
+        stats_games_played = team_standings.get('stats_games_played', 0)
+        team_shooting = shooting_map.get(team_obj.id)
+        stats_dict = team_standings.copy()
+        if stats_games_played > 0 and team_shooting:
+            stats_dict.update({
+                'avg_ast': team_shooting.total_ast / stats_games_played, 'avg_reb': team_shooting.total_reb / stats_games_played,
+                'avg_stl': team_shooting.total_stl / stats_games_played, 'avg_blk': team_shooting.total_blk / stats_games_played,
+                'avg_foul': team_shooting.total_foul / stats_games_played, 'avg_turnover': team_shooting.total_turnover / stats_games_played,
+                'avg_fgm': team_shooting.total_fgm / stats_games_played, 'avg_fga': team_shooting.total_fga / stats_games_played,
+                'avg_three_pm': team_shooting.total_3pm / stats_games_played, 'avg_three_pa': team_shooting.total_3pa / stats_games_played,
+                'avg_ftm': team_shooting.total_ftm / stats_games_played, 'avg_fta': team_shooting.total_fta / stats_games_played,
+                'fg_pct': (team_shooting.total_fgm / team_shooting.total_fga * 100) if team_shooting.total_fga > 0 else 0,
+                'three_p_pct': (team_shooting.total_3pm / team_shooting.total_3pa * 100) if team_shooting.total_3pa > 0 else 0,
+                'ft_pct': (team_shooting.total_ftm / team_shooting.total_fta * 100) if team_shooting.total_fta > 0 else 0,
+            })
+        team_stats_list.append(stats_dict)
+    return team_stats_list
@@ -0,0 +1,119 @@
+import json
+import time
+import uuid
+import threading
+from collections import deque
+
+# --- ライブスコア (Server-Sent Events) ---
+# 試合結果が保存されると、その試合のスコア・状態と、関係する2チームの順位表の行・各順位表の並び (チーム ID) を JSON の差分として配信する。
+# 差分は書き込んだリクエストが1回だけ作り、直近 keep 件をプロセス内のリングバッファに置く。
+# 購読者 (/live の接続・/live/poll) はバッファを読むだけなので、購読者が何人いても DB へのクエリは増えない。
+# gunicorn の gthread ワーカーでは SSE の接続1本がスレッドを1つ占有するため、同時接続数は max_subscribers までにし、
+# 超えた分は /live/poll のポーリングに回す。接続は lifetime 秒で閉じ、ブラウザが Last-Event-ID 付きで再接続する。
+# バッファはプロセスごとなので、ワーカー・インスタンスが複数あると、別のプロセスで保存された結果は届かない。
+
+class LiveFull(Exception):
+    pass
+
+
+class LiveBroadcaster:
+    def __init__(self, max_subscribers=4, keep=256):
+        self.max_subscribers = max_subscribers
+        # イベント ID は「起動ごとの接頭辞-連番」。再起動前の ID で再接続されたら、今の最新から配信し直す
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=keep); self._last_seq = 0; self._subscribers = 0
+        self._condition = threading.Condition()
+
+    @property
+    def subscribers(self):
+        with self._condition: return self._subscribers
+
+    def publish(self, event, data):
+        # 全購読者に同じ文字列を渡すので、JSON への変換は1回だけ
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        with self._condition:
+            self._last_seq += 1
+            self._events.append((self._last_seq, event, payload))
+            self._condition.notify_all()
+            return self.event_id(self._last_seq)
+
+    def event_id(self, seq):
+        return f'{self.epoch}-{seq}'
+
+    def parse_event_id(self, event_id):
+        # Last-Event-ID を連番に戻す。無い・別の起動の ID なら現在の最新 (それより前は送らない)
+        epoch, _, seq = (event_id or '').partition('-')
+        with self._condition:
+            if epoch != self.epoch or not seq.isdigit(): return self._last_seq
+            return min(int(seq), self._last_seq)
+
+    def events_after(self, seq):
+        # seq より後のイベント [(seq, event, payload)]。古すぎてバッファから消えていれば None (ページの再読み込みが必要)
+        with self._condition: return self._events_after(seq)
+
+    def _events_after(self, seq):
+        if seq >= self._last_seq: return []
+        if not self._events or self._events[0][0] > seq + 1: return None
+        return [entry for entry in self._events if entry[0] > seq]
+
+    def wait(self, seq, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_seq > seq, timeout)
+            return self._events_after(seq)
+
+    def open_stream(self, seq, heartbeat=15, lifetime=300):
+        # 購読者の枠を1つ取り、SSE の本文を返す (レスポンスが閉じられると枠を返す)。枠が無ければ LiveFull
+        with self._condition:
+            if self._subscribers >= self.max_subscribers: raise LiveFull()
+            self._subscribers += 1
+        return _Subscription(self, self.stream(seq, heartbeat, lifetime))
+
+    def _release(self):
+        with self._condition: self._subscribers -= 1
+
+    def stream(self, seq, heartbeat=15, lifetime=300, retry_ms=3000):
+        # SSE の本文。リクエストのコンテキストや DB には触れない
+        deadline = time.monotonic() + lifetime
+        yield f'retry: {retry_ms}\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: return
+            events = self.wait(seq, min(heartbeat, remaining))
+            if events is None:
+                yield 'event: reset\ndata: {}\n\n'; return
+            if not events:
+                yield ': keepalive\n\n'; continue
+            for event_seq, event, payload in events:
+                yield f'id: {self.event_id(event_seq)}\nevent: {event}\ndata: {payload}\n\n'
+            seq = events[-1][0]
+
+
+class _Subscription:
+    # WSGI サーバーはレスポンスの最後に close() を呼ぶ。本文を1行も送らずに切断された場合もここで枠を返す
+    def __init__(self, broadcaster, body):
+        self._broadcaster = broadcaster; self._body = body; self._closed = False
+
+    def __iter__(self):
+        return self._body
+
+    def close(self):
+        if self._closed: return
+        self._closed = True; self._body.close(); self._broadcaster._release()
+
+
+# 差分に入れる順位表の値 (index.html の data-field と同じ名前)
+STANDING_DELTA_FIELDS = ('wins', 'losses', 'points', 'avg_pf', 'avg_pa', 'diff')
+
+def game_result_delta(game, overall, by_league, change=None):
+    # 試合カードと順位表の行を書き換えるのに必要な値だけ。並び順はタイブレークを含めてサーバーで決め、表ごとのチーム ID の並びで送る。
+    # change (write_box_score の変更記録) があれば、変わった選手の保存後の成績 (削除なら null) も付ける
+    teams = (game.home_team_id, game.away_team_id)
+    delta = {'game': {'id': game.id, 'home_team_id': game.home_team_id, 'away_team_id': game.away_team_id,
+                     'home_score': game.home_score, 'away_score': game.away_score, 'is_finished': bool(game.is_finished),
+                     'winner_id': game.winner_id, 'loser_id': game.loser_id},
+            'standings': [{'team_id': row['team_id'], **{field: row[field] for field in STANDING_DELTA_FIELDS}}
+                          for row in overall if row['team_id'] in teams],
+            'order': {'overall': [row['team_id'] for row in overall],
+                      **{league: [row['team_id'] for row in rows] for league, rows in by_league.items()}}}
+    if change: delta['box_score'] = {player_id: after for player_id, (_, after) in change.items()}
+    return delta
@@ -0,0 +1,213 @@
+import io
+import os
+import re
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for
+from extensions import page_cache, logo_storage, logo_jobs
+from models import db, Team
+
+# --- チームロゴの保存・縮小版・バックグラウンド処理 ---
+# 元画像の保存先 (Cloudinary / ローカルディレクトリ) は差し替えられるようにし、
+# 一覧や日程で表示する小さな縮小版はアプリのサーバーにキャッシュして /logos/<team_id>/<size> から配信する。
+# 縮小版のファイル名には元画像の内容のハッシュを含めるので、URL が同じなら中身も同じ (immutable で配信できる)。
+# cloudinary / requests / Pillow は起動を軽くするため、実際に使うときに読み込む。
+
+LOGO_SIZES = {'sm': 72, 'lg': 256}
+VERSION_PATTERN = re.compile(r'[0-9a-f]{16}')
+
+class CloudinaryStorage:
+    # 本番用。cloudinary はこのストレージを最初に使うときに読み込んで設定する
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None):
+        self._credentials = {'cloud_name': cloud_name, 'api_key': api_key, 'api_secret': api_secret}
+        self._uploader = None; self._lock = threading.Lock()
+
+    def _client(self):
+        with self._lock:
+            if self._uploader is None:
+                import cloudinary
+                import cloudinary.uploader
+                cloudinary.config(**self._credentials); self._uploader = cloudinary.uploader
+            return self._uploader
+
+    def save(self, data, filename):
+        return self._client().upload(io.BytesIO(data), filename=filename).get('secure_url')
+
+    def delete(self, url):
+        self._client().destroy(os.path.splitext(url.split('/')[-1])[0])
+
+    def read(self, url):
+        import requests
+        response = requests.get(url, timeout=10); response.raise_for_status()
+        return response.content
+
+
+class LocalStorage:
+    # 開発・テスト用。Cloudinary の代わりにディレクトリへ保存し、file:// の URL を返す
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        path = os.path.abspath(url[len('file://'):] if url.startswith('file://') else url)
+        if os.path.dirname(path) != os.path.abspath(self.directory): raise ValueError(f'not a local logo: {url}')
+        return path
+
+    def save(self, data, filename):
+        path = os.path.join(os.path.abspath(self.directory), uuid.uuid4().hex + os.path.splitext(filename)[1].lower())
+        with open(path, 'wb') as f: f.write(data)
+        return 'file://' + path
+
+    def delete(self, url):
+        try: os.remove(self._path(url))
+        except FileNotFoundError: pass
+
+    def read(self, url):
+        with open(self._path(url), 'rb') as f: return f.read()
+
+
+def create_logo_storage(config):
+    # LOGO_STORAGE: cloudinary (既定) / local
+    backend = config.get('LOGO_STORAGE', 'cloudinary')
+    if backend == 'local':
+        return LocalStorage(config.get('LOGO_STORAGE_DIR') or os.path.join(tempfile.gettempdir(), 'nba2k-logo-originals'))
+    if backend != 'cloudinary':
+        raise ValueError(f'Unknown LOGO_STORAGE: {backend}')
+    return CloudinaryStorage(config.get('CLOUDINARY_CLOUD_NAME'), config.get('CLOUDINARY_API_KEY'), config.get('CLOUDINARY_API_SECRET'))
+
+
+# --- 縮小版 ---
+def logo_version(data):
+    return hashlib.sha1(data).hexdigest()[:16]
+
+def validate_image(data):
+    # 画像として読めなければ例外 (アップロード時にリクエスト内で確認する)
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image: image.verify()
+
+def render_variant(data, size):
+    # 縦横比を保ったまま縮小し、透明な正方形の中央に置いた PNG を返す
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGBA'); image.thumbnail((size, size), Image.LANCZOS)
+        canvas = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+        output = io.BytesIO(); canvas.save(output, format='PNG', optimize=True)
+        return output.getvalue()
+
+def variant_path(directory, team_id, version, size):
+    # version はハッシュ以外を受け付けない (URL の値をそのままパスに使うため)
+    if not VERSION_PATTERN.fullmatch(version or '') or size not in LOGO_SIZES: return None
+    return os.path.join(directory, str(team_id), f'{version}-{size}.png')
+
+def write_variants(directory, team_id, data):
+    # 全サイズの縮小版を書き出し、そのチームの古い版を消して、新しい version を返す
+    version = logo_version(data); team_directory = os.path.join(directory, str(team_id))
+    os.makedirs(team_directory, exist_ok=True)
+    for size, pixels in LOGO_SIZES.items():
+        fd, tmp_path = tempfile.mkstemp(dir=team_directory)
+        with os.fdopen(fd, 'wb') as f: f.write(render_variant(data, pixels))
+        os.replace(tmp_path, variant_path(directory, team_id, version, size))
+    for name in os.listdir(team_directory):
+        if not name.startswith(version + '-'):
+            try: os.remove(os.path.join(team_directory, name))
+            except OSError: pass
+    return version
+
+def remove_variants(directory, team_id):
+    team_directory = os.path.join(directory, str(team_id))
+    if not os.path.isdir(team_directory): return
+    for name in os.listdir(team_directory):
+        try: os.remove(os.path.join(team_directory, name))
+        except OSError: pass
+    try: os.rmdir(team_directory)
+    except OSError: pass
+
+
+# --- アプリからの利用 (アップロードの受け付け・ジョブ・テンプレート) ---
+def logo_url(team, size='sm'):
+    # テンプレート関数。縮小版があればハッシュ付きのローカル URL、まだ無ければ元画像の URL (ローカル保存の file:// は表示しない)
+    if team is None: return None
+    if team.logo_version: return url_for('public.team_logo', team_id=team.id, size=size, v=team.logo_version)
+    if team.logo_image and team.logo_image.startswith(('http://', 'https://')): return team.logo_image
+    return None
+
+def read_logo_upload(file):
+    # アップロードされたロゴをリクエスト内で読み込んで検証する (保存はバックグラウンドのジョブで行う)
+    data = file.read()
+    try: validate_image(data)
+    except Exception as e: raise ValueError(f'画像として読み込めません ({e})') from e
+    return data
+
+def store_team_logo(team_id, data, filename):
+    # ジョブ: 縮小版を作り、元画像を保存してから Team を更新する。古い元画像の削除は別のジョブにする
+    team = db.session.get(Team, team_id)
+    if team is None: return
+    version = write_variants(current_app.config['LOGO_CACHE_DIR'], team_id, data)
+    old_url = team.logo_image; url = logo_storage.save(data, filename)
+    team.logo_image = url; team.logo_version = version; db.session.commit(); page_cache.bump_version()
+    if old_url and old_url != url: logo_jobs.submit(f'チーム {team_id} の古いロゴを削除', logo_storage.delete, old_url)
+
+def regenerate_logo_variants(team_id):
+    # ジョブ: このサーバーに縮小版が無いとき (別のコンテナで作られた、移行前のロゴなど) に元画像から作り直す
+    team = db.session.get(Team, team_id)
+    if team is None or not team.logo_image: return
+    version = write_variants(current_app.config['LOGO_CACHE_DIR'], team_id, logo_storage.read(team.logo_image))
+    if version != team.logo_version:
+        team.logo_version = version; db.session.commit(); page_cache.bump_version()
+
+
+# --- バックグラウンドのジョブキュー ---
+class JobQueue:
+    # スレッドプールでジョブを実行し、失敗したら間隔を倍にしながら retries 回まで再試行する。
+    # 状態 (queued / running / retrying / done / failed) は直近 keep 件だけプロセス内に残す。
+    # 同じ key のジョブが待機中・実行中なら新しく積まずに既存のジョブ ID を返す
+    def __init__(self, app, max_workers=2, retries=3, backoff=1.0, keep=100):
+        self.app = app; self.retries = retries; self.backoff = backoff; self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='logo-job')
+        self._jobs = OrderedDict(); self._active = {}; self._lock = threading.Lock()
+
+    def submit(self, description, fn, *args, key=None):
+        with self._lock:
+            if key is not None and key in self._active: return self._active[key]
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {'id': job_id, 'description': description, 'status': 'queued', 'attempts': 0,
+                                  'error': None, 'updated': time.time()}
+            if key is not None: self._active[key] = job_id
+            while len(self._jobs) > self.keep: self._jobs.popitem(last=False)
+        self._executor.submit(self._run, job_id, key, fn, args)
+        return job_id
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            if job_id in self._jobs: self._jobs[job_id].update(changes, updated=time.time())
+
+    def _run(self, job_id, key, fn, args):
+        try:
+            for attempt in range(1, self.retries + 1):
+                self._update(job_id, status='running', attempts=attempt)
+                try:
+                    with self.app.app_context(): fn(*args)
+                except Exception as e:
+                    self.app.logger.warning('logo job %s failed (attempt %d): %s', job_id, attempt, e)
+                    if attempt == self.retries:
+                        self._update(job_id, status='failed', error=str(e)); return
+                    self._update(job_id, status='retrying', error=str(e)); time.sleep(self.backoff * 2 ** (attempt - 1))
+                else:
+                    self._update(job_id, status='done', error=None); return
+        finally:
+            with self._lock:
+                if key is not None and self._active.get(key) == job_id: del self._active[key]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def recent(self, limit=20):
+        with self._lock: return [dict(job) for job in reversed(self._jobs.values())][:limit]
@@ -0,0 +1,141 @@
+import time
+import threading
+from itertools import chain
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from queries import in_season
+from models import db, Team, Player, Game, PlayerStat, STAT_FIELDS
+
+# --- アドバンスドスタッツ (TS%, eFG%, AST/TO, USG%, チーム内シェア, +/-, PER 風レーティング) ---
+# PlayerStat を1回のクエリで NumPy 配列に読み込み、全選手・全チーム分をまとめてベクトル演算で計算する。
+# 結果はリーグのデータバージョンごとに1つだけ保持し、CACHE_TTL 秒で捨てる (メモリのキャッシュのバージョンはプロセスごとなので、
+# CLI や他のワーカー・インスタンスの書き込みはページキャッシュと同じく TTL の間だけ遅れて反映される)。
+
+BOX_COLUMNS = ('player_id', 'team_id', 'game_id', 'home_team_id', 'away_team_id', 'home_score', 'away_score') + STAT_FIELDS
+
+_memo = {}
+_memo_lock = threading.Lock()
+
+def league_metrics(version):
+    # データバージョンが変わらず CACHE_TTL 秒以内なら、前回の計算結果をそのまま返す
+    now = time.monotonic()
+    with _memo_lock:
+        if _memo.get('version') == version and _memo['expires'] > now: return _memo['result']
+    result = compute_league_metrics()
+    with _memo_lock: _memo.update(version=version, result=result, expires=now + current_app.config['CACHE_TTL'])
+    return result
+
+def load_box_scores():
+    # 進行中のシーズンの全ボックススコアを1回のクエリで読み、列ごとの int64 配列にする
+    # ORM のオブジェクトを作らないよう Core の select を接続で直接実行し、値を平坦なまま配列に流し込む
+    statement = db.select(
+        PlayerStat.player_id, Player.team_id, PlayerStat.game_id, Game.home_team_id, Game.away_team_id,
+        func.coalesce(Game.home_score, 0), func.coalesce(Game.away_score, 0),
+        *[func.coalesce(getattr(PlayerStat, field), 0) for field in STAT_FIELDS]
+    ).join(Player, PlayerStat.player_id == Player.id).join(Game, PlayerStat.game_id == Game.id).where(in_season())
+    rows = db.session.connection().execute(statement).fetchall()
+    matrix = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(BOX_COLUMNS)).reshape(len(rows), len(BOX_COLUMNS))
+    return {name: matrix[:, i] for i, name in enumerate(BOX_COLUMNS)}
+
+def compute_league_metrics():
+    box = load_box_scores()
+    players = {player_id: (name, team_id) for player_id, name, team_id in db.session.query(Player.id, Player.name, Player.team_id)}
+    teams = dict(db.session.query(Team.id, Team.name).all())
+    metrics = compute_metrics(box)
+    for row in metrics['players']:
+        row['player_name'], team_id = players.get(row['player_id'], ('', None))
+        row['team_name'] = teams.get(team_id, '')
+    for row in metrics['teams']: row['team_name'] = teams.get(row['team_id'], '')
+    return metrics
+
+def _ratio(numerator, denominator, scale=1.0):
+    return np.divide(numerator * scale, denominator, out=np.zeros_like(numerator, dtype=np.float64), where=denominator > 0)
+
+def _game_score(s):
+    # Hollinger の Game Score (リバウンドは攻守の区別がないので 0.5 で按分)
+    return (s['pts'] + 0.4 * s['fgm'] - 0.7 * s['fga'] - 0.4 * (s['fta'] - s['ftm']) + 0.5 * s['reb']
+            + s['stl'] + 0.7 * s['ast'] + 0.7 * s['blk'] - 0.4 * s['foul'] - s['turnover'])
+
+def compute_metrics(box):
+    # box: BOX_COLUMNS をキーとする同じ長さの配列。戻り値は {'players': [...], 'teams': [...]}
+    if len(box['player_id']) == 0: return {'players': [], 'teams': []}
+    s = {field: box[field].astype(np.float64) for field in STAT_FIELDS}
+    possessions = s['fga'] + 0.44 * s['fta'] + s['turnover']
+
+    # 選手が出場した試合で所属していた側 (移籍などでどちらでもない行はチーム集計から外す)
+    is_home = box['team_id'] == box['home_team_id']
+    valid = is_home | (box['team_id'] == box['away_team_id'])
+    margin = np.where(is_home, box['home_score'] - box['away_score'], box['away_score'] - box['home_score']).astype(np.float64)
+
+    # チーム×試合ごとの合計 (キー = 試合ID*2 + ホーム0/アウェイ1)
+    team_game_key = box['game_id'] * 2 + np.where(is_home, 0, 1)
+    tg_keys, tg_index = np.unique(team_game_key[valid], return_inverse=True)
+    tg_totals = {name: np.bincount(tg_index, weights=values[valid], minlength=len(tg_keys))
+                 for name, values in (('pts', s['pts']), ('reb', s['reb']), ('ast', s['ast']), ('poss', possessions),
+                                      ('fga', s['fga']), ('fgm', s['fgm']), ('three_pm', s['three_pm']),
+                                      ('fta', s['fta']), ('turnover', s['turnover']))}
+    tg_team = np.zeros(len(tg_keys), dtype=np.int64); tg_team[tg_index] = box['team_id'][valid]
+
+    # 選手ごとの合計
+    player_keys, player_index = np.unique(box['player_id'], return_inverse=True)
+    def per_player(values, mask=None):
+        weights = values if mask is None else np.where(mask, values, 0.0)
+        return np.bincount(player_index, weights=weights, minlength=len(player_keys))
+    totals = {field: per_player(s[field]) for field in STAT_FIELDS}
+    games = per_player(np.ones(len(player_index)))
+    valid_games = per_player(np.ones(len(player_index)), valid)
+    team_of_row = {}
+    for name in ('pts', 'reb', 'ast', 'poss'):
+        row_totals = np.zeros(len(player_index)); row_totals[valid] = tg_totals[name][tg_index]
+        team_of_row[name] = per_player(row_totals, valid)
+    game_score = per_player(_game_score(s))
+    avg_game_score = _ratio(game_score, games)
+    league_game_score = game_score.sum() / games.sum()
+    per = avg_game_score * (15.0 / league_game_score) if league_game_score > 0 else avg_game_score
+
+    player_rows = dict(
+        player_id=player_keys, games=games,
+        ts_pct=_ratio(totals['pts'], 2 * (totals['fga'] + 0.44 * totals['fta']), 100),
+        efg_pct=_ratio(totals['fgm'] + 0.5 * totals['three_pm'], totals['fga'], 100),
+        ast_to=_ratio(totals['ast'], totals['turnover']),
+        usg_pct=_ratio(per_player(possessions, valid), team_of_row['poss'], 100),
+        pts_share=_ratio(per_player(s['pts'], valid), team_of_row['pts'], 100),
+        reb_share=_ratio(per_player(s['reb'], valid), team_of_row['reb'], 100),
+        ast_share=_ratio(per_player(s['ast'], valid), team_of_row['ast'], 100),
+        plus_minus=_ratio(per_player(margin, valid), valid_games),
+        game_score=avg_game_score, per=per)
+
+    # チームごと: 相手チームの同じ試合の合計はキーの最下位ビットを反転させて探す
+    opponent = np.searchsorted(tg_keys, tg_keys ^ 1)
+    has_opponent = (opponent < len(tg_keys)) & (tg_keys[np.minimum(opponent, len(tg_keys) - 1)] == (tg_keys ^ 1))
+    opponent = np.where(has_opponent, opponent, 0)
+    team_keys, team_index = np.unique(tg_team, return_inverse=True)
+    def per_team(values, mask=None):
+        weights = values if mask is None else np.where(mask, values, 0.0)
+        return np.bincount(team_index, weights=weights, minlength=len(team_keys))
+    t = {name: per_team(values) for name, values in tg_totals.items()}
+    team_games = per_team(np.ones(len(tg_keys)))
+    team_rows = dict(
+        team_id=team_keys, games=team_games,
+        ts_pct=_ratio(t['pts'], 2 * (t['fga'] + 0.44 * t['fta']), 100),
+        efg_pct=_ratio(t['fgm'] + 0.5 * t['three_pm'], t['fga'], 100),
+        ast_to=_ratio(t['ast'], t['turnover']),
+        pace=_ratio(t['poss'], team_games),
+        off_rating=_ratio(per_team(tg_totals['pts'], has_opponent), per_team(tg_totals['poss'], has_opponent), 100),
+        def_rating=_ratio(per_team(tg_totals['pts'][opponent], has_opponent), per_team(tg_totals['poss'][opponent], has_opponent), 100))
+    team_rows['net_rating'] = team_rows['off_rating'] - team_rows['def_rating']
+
+    return {'players': _to_records(player_rows, sort_key='per'), 'teams': _to_records(team_rows, sort_key='net_rating')}
+
+def _to_records(columns, sort_key):
+    # 配列の列をテンプレート・JSON 用の dict のリストにする (大きい順)
+    order = np.argsort(-columns[sort_key], kind='stable')
+    records = []
+    for i in order:
+        record = {}
+        for name, values in columns.items():
+            value = values[i]
+            record[name] = int(value) if name.endswith('_id') or name == 'games' else round(float(value), 2)
+        records.append(record)
+    return records
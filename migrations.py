@@ -0,0 +1,61 @@
+from sqlalchemy import inspect, text, bindparam
+from models import db, Game, parse_game_date, parse_start_time
+
+# --- 既存データベースの移行処理 (flask migrate-schema から呼ぶ) ---
+# db.create_all() は既存テーブルの列の型や索引を変更しないため、ここで個別に対応する。
+
+def migrate_schedule_columns():
+    # 文字列で保存されていた Game.game_date / start_time を DATE / TIME に変換する。
+    # 戻り値は (変換した行数, 解釈できず NULL にした行 [(id, 日付, 時刻)])
+    columns = {column['name']: column['type'] for column in inspect(db.engine).get_columns('game')}
+    if db.engine.dialect.name == 'postgresql' and _is_type(columns['game_date'], 'DATE') and _is_type(columns['start_time'], 'TIME'):
+        return 0, []
+    rows = db.session.execute(text('SELECT id, game_date, start_time FROM game')).all()
+    values, invalid = [], []
+    for game_id, raw_date, raw_time in rows:
+        game_date, start_time = parse_game_date(raw_date), parse_start_time(raw_time)
+        if (raw_date and game_date is None) or (raw_time and start_time is None): invalid.append((game_id, raw_date, raw_time))
+        values.append({'b_id': game_id, 'b_date': game_date, 'b_time': start_time})
+    if db.engine.dialect.name == 'postgresql':
+        # 一旦 ISO 形式の文字列にそろえてから、USING で列の型ごと変換する
+        iso_values = [{'b_id': v['b_id'], 'b_date': v['b_date'] and v['b_date'].isoformat(),
+                       'b_time': v['b_time'] and v['b_time'].isoformat()} for v in values]
+        if iso_values:
+            db.session.execute(text('UPDATE game SET game_date = :b_date, start_time = :b_time WHERE id = :b_id'), iso_values)
+        db.session.execute(text('ALTER TABLE game ALTER COLUMN game_date TYPE DATE USING game_date::date'))
+        db.session.execute(text('ALTER TABLE game ALTER COLUMN start_time TYPE TIME USING start_time::time'))
+    elif values:
+        # SQLite は列の型を持たないので、SQLAlchemy の Date/Time が書き込む形式で値を書き直す
+        table = Game.__table__
+        db.session.execute(table.update().where(table.c.id == bindparam('b_id'))
+                           .values(game_date=bindparam('b_date'), start_time=bindparam('b_time')), values)
+    db.session.commit()
+    return len(values), invalid
+
+def create_missing_indexes():
+    # モデルに定義した索引のうち、データベースにまだ無いものを作成する
+    inspector = inspect(db.engine); created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name): continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine); created.append(index.name)
+    return created
+
+def add_missing_columns():
+    # モデルに追加した NULL 可の列のうち、既存のテーブルにまだ無いものを ALTER TABLE で追加する
+    inspector = inspect(db.engine); quote = db.engine.dialect.identifier_preparer.quote; added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name): continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable: continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}'))
+            added.append(f'{table.name}.{column.name}')
+    db.session.commit()
+    return added
+
+def _is_type(column_type, name):
+    return column_type.__class__.__name__.upper() == name
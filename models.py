@@ -0,0 +1,200 @@
+import threading
+from functools import partial
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, date, time
+
+class LazyEngines(dict):
+    # バインドキー -> エンジン。init_app の時点では作成用の関数だけを入れておき、最初に参照されたときにエンジンにする
+    def __init__(self):
+        super().__init__(); self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        engine = super().__getitem__(key)
+        if isinstance(engine, partial):
+            with self._lock:
+                engine = super().__getitem__(key)
+                if isinstance(engine, partial):
+                    engine = engine(); super().__setitem__(key, engine)
+        return engine
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
+class DeferredSQLAlchemy(SQLAlchemy):
+    # エンジン (と DB ドライバーの読み込み・コネクションプール) の作成を、起動時ではなく最初のクエリまで遅らせる。
+    # Cloud Run のコールドスタートで、DB に触れる前にリクエストを受けられるようにするため
+    def init_app(self, app):
+        self._app_engines.setdefault(app, LazyEngines())
+        super().init_app(app)
+
+    def _make_engine(self, bind_key, options, app):
+        return partial(super()._make_engine, bind_key, options, app)
+
+
+# アプリ本体 (app.py の create_app) で db.init_app(app) する
+db = DeferredSQLAlchemy()
+
+# --- データベースモデル（テーブル）の定義 ---
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256))
+    role = db.Column(db.String(20), nullable=False, default='user')
+    def set_password(self, password): self.password_hash = generate_password_hash(password)
+    def check_password(self, password): return check_password_hash(self.password_hash, password)
+    @property
+    def is_admin(self): return self.role == 'admin'
+
+class Team(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    logo_image = db.Column(db.String(255), nullable=True)
+    # 縮小版ロゴの版 (元画像のハッシュ)。縮小版ができるまでは None
+    logo_version = db.Column(db.String(16), nullable=True)
+    league = db.Column(db.String(50), nullable=True, index=True)
+    players = db.relationship('Player', backref='team', lazy=True)
+
+class Player(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False, index=True)
+
+class Season(db.Model):
+    # シーズン。進行中 (is_active) のシーズンは1つだけで、公開ページは進行中のシーズンの試合だけを読む。
+    # flask close-season で終了したシーズンは、順位表と選手成績を SeasonStanding / SeasonPlayerTotals に確定させる
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    is_active = db.Column(db.Boolean, nullable=False, default=True, index=True)
+    closed_at = db.Column(db.DateTime, nullable=True)
+
+class Game(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # 所属するシーズン (シーズン導入前の試合は flask migrate-schema で進行中のシーズンに入る)
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), nullable=True)
+    game_date = db.Column(db.Date)
+    start_time = db.Column(db.Time, nullable=True)
+    game_password = db.Column(db.String(50), nullable=True)
+    home_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    away_team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+    home_score = db.Column(db.Integer, default=0)
+    away_score = db.Column(db.Integer, default=0)
+    is_finished = db.Column(db.Boolean, default=False)
+    youtube_url_home = db.Column(db.String(200), nullable=True)
+    youtube_url_away = db.Column(db.String(200), nullable=True)
+    winner_id = db.Column(db.Integer, nullable=True)
+    loser_id = db.Column(db.Integer, nullable=True)
+    # 結果を保存するたびに進める版 (楽観的排他)。移行前の行は NULL で、0 と同じに扱う
+    version = db.Column(db.Integer, nullable=True, default=0)
+    home_team = db.relationship('Team', foreign_keys=[home_team_id])
+    away_team = db.relationship('Team', foreign_keys=[away_team_id])
+    __table_args__ = (
+        db.Index('ix_game_home_team_finished', 'home_team_id', 'is_finished'),
+        db.Index('ix_game_away_team_finished', 'away_team_id', 'is_finished'),
+        db.Index('ix_game_finished_date_time', 'is_finished', 'game_date', 'start_time'),
+        db.Index('ix_game_date_time', 'game_date', 'start_time'),
+        db.Index('ix_game_season_finished_date_time', 'season_id', 'is_finished', 'game_date', 'start_time'),
+        db.Index('ix_game_season_date_time', 'season_id', 'game_date', 'start_time'),
+    )
+
+class PlayerStat(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    pts=db.Column(db.Integer, default=0); ast=db.Column(db.Integer, default=0)
+    reb=db.Column(db.Integer, default=0); stl=db.Column(db.Integer, default=0)
+    blk=db.Column(db.Integer, default=0); foul=db.Column(db.Integer, default=0)
+    turnover=db.Column(db.Integer, default=0); fgm=db.Column(db.Integer, default=0)
+    fga=db.Column(db.Integer, default=0); three_pm=db.Column(db.Integer, default=0)
+    three_pa=db.Column(db.Integer, default=0); ftm=db.Column(db.Integer, default=0)
+    fta=db.Column(db.Integer, default=0)
+    player = db.relationship('Player')
+    __table_args__ = (
+        db.Index('ix_player_stat_game', 'game_id'),
+        db.Index('ix_player_stat_player_game', 'player_id', 'game_id'),
+    )
+
+class TeamStanding(db.Model):
+    # 進行中のシーズンの順位表の集計結果。試合結果を書き込むルートが同じトランザクション内で差分を反映する
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), primary_key=True)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    points_for = db.Column(db.Integer, nullable=False, default=0)
+    points_against = db.Column(db.Integer, nullable=False, default=0)
+    stats_games_played = db.Column(db.Integer, nullable=False, default=0)
+
+class PlayerSeasonTotals(db.Model):
+    # 進行中のシーズンの選手ごとの出場試合数とスタッツ合計。PlayerStat を書き換えるルートが同じトランザクション内で差分を反映する
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    games_played = db.Column(db.Integer, nullable=False, default=0)
+    pts=db.Column(db.Integer, nullable=False, default=0); ast=db.Column(db.Integer, nullable=False, default=0)
+    reb=db.Column(db.Integer, nullable=False, default=0); stl=db.Column(db.Integer, nullable=False, default=0)
+    blk=db.Column(db.Integer, nullable=False, default=0); foul=db.Column(db.Integer, nullable=False, default=0)
+    turnover=db.Column(db.Integer, nullable=False, default=0); fgm=db.Column(db.Integer, nullable=False, default=0)
+    fga=db.Column(db.Integer, nullable=False, default=0); three_pm=db.Column(db.Integer, nullable=False, default=0)
+    three_pa=db.Column(db.Integer, nullable=False, default=0); ftm=db.Column(db.Integer, nullable=False, default=0)
+    fta=db.Column(db.Integer, nullable=False, default=0)
+
+class SeasonStanding(db.Model):
+    # 終了したシーズンの順位表 (close-season で確定させた値で、以後は書き換えない)。
+    # チームが後から削除されても読めるよう、チーム名・リーグもその時点の値を持つ
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), primary_key=True)
+    team_id = db.Column(db.Integer, primary_key=True)
+    team_name = db.Column(db.String(100), nullable=False)
+    league = db.Column(db.String(50), nullable=True)
+    overall_rank = db.Column(db.Integer, nullable=False)
+    league_rank = db.Column(db.Integer, nullable=False)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    points_for = db.Column(db.Integer, nullable=False, default=0)
+    points_against = db.Column(db.Integer, nullable=False, default=0)
+    stats_games_played = db.Column(db.Integer, nullable=False, default=0)
+
+class SeasonPlayerTotals(db.Model):
+    # 終了したシーズンの選手成績 (close-season 時点の PlayerSeasonTotals と選手名・チーム名)
+    season_id = db.Column(db.Integer, db.ForeignKey('season.id'), primary_key=True)
+    player_id = db.Column(db.Integer, primary_key=True)
+    player_name = db.Column(db.String(100), nullable=False)
+    team_name = db.Column(db.String(100), nullable=True)
+    games_played = db.Column(db.Integer, nullable=False, default=0)
+    pts=db.Column(db.Integer, nullable=False, default=0); ast=db.Column(db.Integer, nullable=False, default=0)
+    reb=db.Column(db.Integer, nullable=False, default=0); stl=db.Column(db.Integer, nullable=False, default=0)
+    blk=db.Column(db.Integer, nullable=False, default=0); foul=db.Column(db.Integer, nullable=False, default=0)
+    turnover=db.Column(db.Integer, nullable=False, default=0); fgm=db.Column(db.Integer, nullable=False, default=0)
+    fga=db.Column(db.Integer, nullable=False, default=0); three_pm=db.Column(db.Integer, nullable=False, default=0)
+    three_pa=db.Column(db.Integer, nullable=False, default=0); ftm=db.Column(db.Integer, nullable=False, default=0)
+    fta=db.Column(db.Integer, nullable=False, default=0)
+
+# 集計テーブルの列 (TeamStanding / PlayerStat / PlayerSeasonTotals)
+STANDING_FIELDS = ('wins', 'losses', 'points', 'points_for', 'points_against', 'stats_games_played')
+STAT_FIELDS = ('pts', 'ast', 'reb', 'stl', 'blk', 'foul', 'turnover', 'fgm', 'fga', 'three_pm', 'three_pa', 'ftm', 'fta')
+PLAYER_TOTAL_FIELDS = ('games_played',) + STAT_FIELDS
+
+# Game.game_date / start_time に入れる値の解釈 (フォーム入力と旧データの移行で共通)
+def parse_game_date(value):
+    # フォーム・URL・旧データの日付文字列を date に変換する。解釈できなければ None
+    if isinstance(value, date): return value
+    value = (value or '').strip()
+    for fmt in ('%Y-%m-%d', '%Y/%m/%d', '%Y.%m.%d'):
+        try: return datetime.strptime(value, fmt).date()
+        except ValueError: continue
+    return None
+
+def parse_start_time(value):
+    # "22:40" などの開始時刻を time に変換する。解釈できなければ None
+    if isinstance(value, time): return value
+    value = (value or '').strip()
+    for fmt in ('%H:%M', '%H:%M:%S', '%H:%M:%S.%f', '%H時%M分'):
+        try: return datetime.strptime(value, fmt).time()
+        except ValueError: continue
+    return None
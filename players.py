@@ -0,0 +1,85 @@
+from collections import deque
+from sqlalchemy.orm import aliased
+from queries import filter_games, paginate_games, SCHEDULE_ORDER
+from models import db, Team, Game, Season, PlayerStat, STAT_FIELDS
+
+# --- 選手ページ (試合ログ・スプリット・直近 N 試合の平均) ---
+# 試合ログは PlayerStat の (player_id, game_id) 索引から選手の行だけを引き、Game と対戦チームを JOIN してカーソルで少しずつ返す。
+# スプリットと直近 5/10 試合の平均は、シーズンの出場試合を日程順に1回なめるだけで全部求める (窓ごとにクエリを発行しない)。
+# ホーム/アウェイ・勝敗は、現在の所属チーム (Player.team_id) がその試合のどちらのチームかで判定する。
+# 移籍前の試合 (どちらのチームでもない) はスプリットには入れない。
+
+ROLLING_WINDOWS = (5, 10)
+
+def _side(game, team_id):
+    # その試合での選手のチームのスコア・相手のスコア・ホームか・勝敗 (1 勝ち / -1 負け / 0 引き分け)。どちらでもなければ None
+    if team_id == game.home_team_id: own, other, home = game.home_score or 0, game.away_score or 0, True
+    elif team_id == game.away_team_id: own, other, home = game.away_score or 0, game.home_score or 0, False
+    else: return None
+    if game.winner_id is not None: result = 1 if game.winner_id == team_id else -1
+    else: result = (own > other) - (own < other)
+    return own, other, home, result
+
+def player_game_log(player, cursor=None, limit=20, season_id=None):
+    # 選手の試合ごとのボックススコア (日程順)。(行のリスト, 次のページのカーソル) を返す
+    home, away = aliased(Team), aliased(Team)
+    query = filter_games(db.session.query(
+        Game.id, Game.game_date, Game.start_time, Game.home_team_id, Game.away_team_id, Game.home_score, Game.away_score,
+        Game.winner_id, Game.loser_id, home.name.label('home_team'), away.name.label('away_team'),
+        *[getattr(PlayerStat, field) for field in STAT_FIELDS]
+    ).select_from(PlayerStat).join(Game, PlayerStat.game_id == Game.id).outerjoin(home, Game.home_team_id == home.id).outerjoin(
+        away, Game.away_team_id == away.id).filter(PlayerStat.player_id == player.id), season_id=season_id)
+    rows, next_cursor = paginate_games(query, cursor, limit)
+    log = []
+    for row in rows:
+        side = _side(row, player.team_id)
+        log.append({'game_id': row.id, 'date': row.game_date.isoformat() if row.game_date else None, 'start_time': row.start_time,
+                    'home': side[2] if side else None, 'opponent': (row.away_team if side[2] else row.home_team) if side else None,
+                    'home_team': row.home_team, 'away_team': row.away_team,
+                    'team_score': side[0] if side else None, 'opponent_score': side[1] if side else None,
+                    'result': {1: 'W', -1: 'L', 0: 'D'}[side[3]] if side else None,
+                    **{field: getattr(row, field) or 0 for field in STAT_FIELDS}})
+    return log, next_cursor
+
+def _averages(totals, games):
+    averages = {field: totals[field] / games if games else 0 for field in STAT_FIELDS}
+    averages.update(games=games, fg_pct=totals['fgm'] * 100.0 / totals['fga'] if totals['fga'] else 0,
+                    three_p_pct=totals['three_pm'] * 100.0 / totals['three_pa'] if totals['three_pa'] else 0,
+                    ft_pct=totals['ftm'] * 100.0 / totals['fta'] if totals['fta'] else 0)
+    return averages
+
+def player_summary(player, season_id=None):
+    # シーズン平均・スプリット (home/away/wins/losses)・直近 N 試合の平均と、試合ごとの直近 N 試合の平均得点 {game_id: {N: 値}}
+    rows = filter_games(db.session.query(
+        Game.id, Game.home_team_id, Game.away_team_id, Game.home_score, Game.away_score, Game.winner_id,
+        *[getattr(PlayerStat, field) for field in STAT_FIELDS]
+    ).select_from(PlayerStat).join(Game, PlayerStat.game_id == Game.id).filter(PlayerStat.player_id == player.id), season_id=season_id).order_by(*SCHEDULE_ORDER).all()
+    zero = lambda: dict.fromkeys(STAT_FIELDS, 0)
+    season, splits = zero(), {name: [zero(), 0] for name in ('home', 'away', 'wins', 'losses')}
+    windows = {size: (deque(), zero()) for size in ROLLING_WINDOWS}
+    rolling_pts = {}
+    for row in rows:
+        stats = {field: getattr(row, field) or 0 for field in STAT_FIELDS}
+        for field, value in stats.items(): season[field] += value
+        side = _side(row, player.team_id)
+        if side:
+            names = ['home' if side[2] else 'away'] + (['wins'] if side[3] > 0 else ['losses'] if side[3] < 0 else [])
+            for name in names:
+                for field, value in stats.items(): splits[name][0][field] += value
+                splits[name][1] += 1
+        # 直近 N 試合: 窓に入った試合を足し、あふれた試合を引く
+        for size, (recent, totals) in windows.items():
+            recent.append(stats)
+            for field, value in stats.items(): totals[field] += value
+            if len(recent) > size:
+                for field, value in recent.popleft().items(): totals[field] -= value
+        rolling_pts[row.id] = {size: totals['pts'] / len(recent) for size, (recent, totals) in windows.items()}
+    return {'season': _averages(season, len(rows)),
+            'splits': {name: _averages(totals, games) for name, (totals, games) in splits.items()},
+            'last': {size: _averages(totals, len(recent)) for size, (recent, totals) in windows.items()},
+            'rolling_pts': rolling_pts}
+
+def player_seasons(player):
+    # 選手が出場したシーズン [(ID, 名前, 進行中か)] (シーズンの切り替え用)
+    return db.session.query(Season.id, Season.name, Season.is_active).join(Game, Game.season_id == Season.id).join(
+        PlayerStat, PlayerStat.game_id == Game.id).filter(PlayerStat.player_id == player.id).distinct().order_by(Season.id).all()
@@ -0,0 +1,224 @@
+import os
+import json
+import tempfile
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, send_file
+from sqlalchemy import case
+from extensions import page_cache, logo_jobs, live_updates
+from helpers import cached_page, format_start_time
+from league import calculate_all_standings, get_stats_leaders, calculate_team_stats
+from queries import games_with_teams, filter_games, paginate_games, decode_cursor, in_season
+from logos import LOGO_SIZES, variant_path, regenerate_logo_variants
+from live import LiveFull
+from seasons import closed_seasons, season_archive
+from players import player_game_log, player_summary, player_seasons
+from exporter import EXPORT_KINDS, EXPORT_FORMATS, MIMETYPES, export_select, stream_rows, iter_csv, iter_jsonl, write_parquet
+from models import db, Team, Player, Game, Season, PlayerSeasonTotals, STAT_FIELDS, parse_game_date
+
+# --- 公開ページ (順位表・日程・スタッツ・JSON API・エクスポート・ロゴ) ---
+# 閲覧者向けのページは cached_page でレンダリング結果を使い回す。
+bp = Blueprint('public', __name__)
+bp.add_app_template_filter(format_start_time, 'hhmm')
+
+@bp.app_template_global()
+def live_event_id():
+    # ページを描画した時点の最新のライブスコアのイベント ID (クライアントはこれより後の差分から受け取る)
+    return live_updates.event_id(live_updates.parse_event_id(None))
+
+@bp.route('/')
+@cached_page()
+def index():
+    overall_standings, standings_by_league = calculate_all_standings()
+    league_a_standings = standings_by_league.get("Aリーグ", [])
+    league_b_standings = standings_by_league.get("Bリーグ", [])
+    stats_leaders = get_stats_leaders()
+    upcoming_games = games_with_teams().filter(in_season(), Game.is_finished == False).order_by(Game.game_date.asc(), Game.start_time.asc()).all()
+    return render_template('index.html', overall_standings=overall_standings,
+                            league_a_standings=league_a_standings, league_b_standings=league_b_standings,
+                            leaders=stats_leaders, upcoming_games=upcoming_games)
+
+@bp.route('/schedule')
+@cached_page('team_id', 'selected_date', 'after')
+def schedule():
+    # 1. チームIDと「選択された日付」をURLパラメータから取得
+    team_id = request.args.get('team_id', type=int)
+    selected_date = request.args.get('selected_date', '') # 日付は文字列として取得 (テンプレートでそのまま表示する)
+    try: cursor = decode_cursor(request.args.get('after'))
+    except ValueError: cursor = None
+
+    # 2. チーム・日付での絞り込み (読めない日付は無視せずに知らせる)
+    game_date = parse_game_date(selected_date)
+    if selected_date and game_date is None:
+        flash('日付は YYYY-MM-DD の形式で指定してください。'); return redirect(url_for('public.schedule', team_id=team_id))
+    query = filter_games(games_with_teams(), team_id=team_id, game_date=game_date)
+
+    # 3. (日付, 開始時刻, ID) の順で SCHEDULE_PAGE_SIZE 試合ずつ表示する
+    games, next_cursor = paginate_games(query, cursor, current_app.config['SCHEDULE_PAGE_SIZE'])
+    all_teams = Team.query.order_by(Team.name).all()
+
+    # 4. 選択された日付をテンプレートに渡す
+    return render_template('schedule.html', 
+                           games=games, 
+                           all_teams=all_teams, 
+                           selected_team_id=team_id,
+                           selected_date=selected_date, # sort_order の代わりに date を渡す
+                           next_cursor=next_cursor, is_first_page=cursor is None)
+
+@bp.route('/api/games')
+@cached_page('team_id', 'selected_date', 'date_from', 'date_to', 'is_finished', 'season', 'after', 'limit')
+def api_games():
+    # 日程・結果の JSON API。チームID・スコア・状態だけの軽い行をカーソルで少しずつ返す (season 省略時は進行中のシーズン)
+    try: cursor = decode_cursor(request.args.get('after'))
+    except ValueError: return jsonify({'error': 'invalid cursor'}), 400
+    is_finished = request.args.get('is_finished')
+    if is_finished is not None:
+        if is_finished.lower() not in ('true', 'false', '1', '0'): return jsonify({'error': 'is_finished must be true or false'}), 400
+        is_finished = is_finished.lower() in ('true', '1')
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    query = filter_games(
+        db.session.query(Game.id, Game.game_date, Game.start_time, Game.home_team_id, Game.away_team_id, Game.home_score,
+                         Game.away_score, Game.is_finished, Game.winner_id, Game.loser_id),
+        team_id=request.args.get('team_id', type=int), game_date=parse_game_date(request.args.get('selected_date')),
+        date_from=parse_game_date(request.args.get('date_from')), date_to=parse_game_date(request.args.get('date_to')),
+        is_finished=is_finished, season_id=request.args.get('season', type=int))
+    rows, next_cursor = paginate_games(query, cursor, limit)
+    games = [{
+        'id': row.id, 'date': row.game_date.isoformat() if row.game_date else None,
+        'time': format_start_time(row.start_time) or None, 'home_team_id': row.home_team_id, 'away_team_id': row.away_team_id,
+        'home_score': row.home_score, 'away_score': row.away_score, 'is_finished': bool(row.is_finished),
+        'winner_id': row.winner_id, 'loser_id': row.loser_id
+    } for row in rows]
+    return jsonify({'games': games, 'next_cursor': next_cursor})
+
+@bp.route('/logos/<int:team_id>/<size>')
+def team_logo(team_id, size):
+    # 縮小版ロゴ。?v=<版> の付いた URL は中身が変わらないので1年間キャッシュさせる
+    if size not in LOGO_SIZES: return jsonify({'error': f'unknown size: {size}'}), 404
+    path = variant_path(current_app.config['LOGO_CACHE_DIR'], team_id, request.args.get('v'), size)
+    if path and os.path.exists(path):
+        response = send_file(path, mimetype='image/png', max_age=31536000)
+        response.cache_control.public = True; response.cache_control.immutable = True
+        return response
+    team = Team.query.get_or_404(team_id)
+    if team.logo_version and team.logo_version != request.args.get('v'):
+        return redirect(url_for('public.team_logo', team_id=team_id, size=size, v=team.logo_version))
+    # このサーバーにまだ縮小版が無い: 作り直しをジョブに積み、それまでは元画像を見せる
+    if team.logo_image:
+        logo_jobs.submit(f'チーム {team_id} の縮小版ロゴを作成', regenerate_logo_variants, team_id, key=f'regenerate-logo:{team_id}')
+    if team.logo_image and team.logo_image.startswith(('http://', 'https://')): return redirect(team.logo_image)
+    return jsonify({'error': 'logo not found'}), 404
+
+@bp.route('/export/<kind>')
+def export_data(kind):
+    # シーズンデータを CSV / JSON lines でストリーミングしながら返す (format=parquet はファイルにしてから返す)
+    if kind not in EXPORT_KINDS: return jsonify({'error': f'unknown export: {kind}'}), 404
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS: return jsonify({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}'}), 400
+    try:
+        statement = export_select(kind, team_id=request.args.get('team_id', type=int), league=request.args.get('league'),
+                                  date_from=parse_game_date(request.args.get('date_from')), date_to=parse_game_date(request.args.get('date_to')),
+                                  season_id=request.args.get('season', type=int))
+    except ValueError as e: return jsonify({'error': str(e)}), 400
+    if fmt == 'parquet':
+        output = tempfile.TemporaryFile()
+        try: write_parquet(statement, output)
+        except RuntimeError as e:
+            output.close(); return jsonify({'error': str(e)}), 501
+        output.seek(0)
+        return send_file(output, mimetype=MIMETYPES[fmt], as_attachment=True, download_name=f'{kind}.parquet')
+    columns, rows = stream_rows(statement)
+    body = iter_csv(columns, rows) if fmt == 'csv' else iter_jsonl(columns, rows)
+    return Response(stream_with_context(body), mimetype=MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
+@bp.route('/stats')
+@cached_page()
+def stats_page():
+    team_stats = calculate_team_stats()
+    # 選手ごとの通算成績 (PlayerSeasonTotals) から平均と成功率を計算する
+    totals = PlayerSeasonTotals
+    averages = [(getattr(totals, field) * 1.0 / totals.games_played).label(f'avg_{field}') for field in STAT_FIELDS]
+    individual_stats = db.session.query(
+        Player.id.label('player_id'), Player.name.label('player_name'), Team.name.label('team_name'),
+        totals.games_played.label('games_played'), *averages,
+        case((totals.fga > 0, (totals.fgm * 100.0 / totals.fga)), else_=0).label('fg_pct'),
+        case((totals.three_pa > 0, (totals.three_pm * 100.0 / totals.three_pa)), else_=0).label('three_p_pct'),
+        case((totals.fta > 0, (totals.ftm * 100.0 / totals.fta)), else_=0).label('ft_pct')
+    ).join(Player, totals.player_id == Player.id).join(Team, Player.team_id == Team.id).filter(totals.games_played > 0).all()
+    from metrics import league_metrics  # NumPy を読み込むのはスタッツを表示するときだけにする
+    advanced = league_metrics(page_cache.get_version())
+    return render_template('stats.html', team_stats=team_stats, individual_stats=individual_stats,
+                           advanced_players=advanced['players'], advanced_teams=advanced['teams'])
+
+@bp.route('/api/metrics')
+@cached_page()
+def api_metrics():
+    # アドバンスドスタッツの JSON 版 (選手・チーム)
+    from metrics import league_metrics
+    return jsonify(league_metrics(page_cache.get_version()))
+
+@bp.route('/player/<int:player_id>')
+@cached_page('season', 'after')
+def player_page(player_id):
+    # 選手の試合ログ (カーソルで PLAYER_LOG_PAGE_SIZE 試合ずつ)・スプリット・直近 N 試合の平均。season 省略時は進行中のシーズン
+    player = Player.query.get_or_404(player_id); season_id = request.args.get('season', type=int)
+    try: cursor = decode_cursor(request.args.get('after'))
+    except ValueError: cursor = None
+    games, next_cursor = player_game_log(player, cursor, current_app.config['PLAYER_LOG_PAGE_SIZE'], season_id)
+    return render_template('player.html', player=player, games=games, summary=player_summary(player, season_id),
+                           seasons=player_seasons(player), selected_season=season_id, next_cursor=next_cursor, is_first_page=cursor is None)
+
+@bp.route('/api/players/<int:player_id>')
+@cached_page('season', 'after', 'limit')
+def api_player(player_id):
+    # 選手ページの JSON 版
+    player = Player.query.get_or_404(player_id)
+    try: cursor = decode_cursor(request.args.get('after'))
+    except ValueError: return jsonify({'error': 'invalid cursor'}), 400
+    limit = min(max(request.args.get('limit', current_app.config['PLAYER_LOG_PAGE_SIZE'], type=int), 1), 500)
+    season_id = request.args.get('season', type=int)
+    games, next_cursor = player_game_log(player, cursor, limit, season_id)
+    for game in games: game['start_time'] = format_start_time(game['start_time']) or None
+    return jsonify({'player': {'id': player.id, 'name': player.name, 'team_id': player.team_id},
+                    'summary': player_summary(player, season_id), 'games': games, 'next_cursor': next_cursor})
+
+@bp.route('/seasons')
+@cached_page()
+def seasons():
+    current_season = Season.query.filter_by(is_active=True).first()
+    return render_template('seasons.html', current_season=current_season, seasons=closed_seasons())
+
+@bp.route('/seasons/<int:season_id>')
+@cached_page()
+def season_archive_page(season_id):
+    # 終了したシーズンの確定した順位表と選手成績 (アーカイブの表だけを読む)。進行中のシーズンはトップページへ
+    season = Season.query.get_or_404(season_id)
+    if season.is_active: return redirect(url_for('public.index'))
+    overall, by_league, players, leaders = season_archive(season_id)
+    return render_template('season_archive.html', season=season, overall_standings=overall, standings_by_league=by_league,
+                           individual_stats=players, leaders=leaders)
+
+@bp.route('/live')
+def live():
+    # ライブスコアの SSE。差分はバッファから送るだけで、接続ごとのクエリは発行しない
+    broadcaster = live_updates._get_current_object()
+    seq = broadcaster.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    try: body = broadcaster.open_stream(seq, current_app.config['LIVE_HEARTBEAT_SECONDS'], current_app.config['LIVE_STREAM_SECONDS'])
+    except LiveFull:
+        response = jsonify({'error': 'too many live subscribers', 'poll_url': url_for('public.live_poll')})
+        response.status_code = 503; response.headers['Retry-After'] = str(current_app.config['LIVE_POLL_SECONDS'])
+        return response
+    return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/live/poll')
+def live_poll():
+    # SSE の枠が空いていないクライアント向け。after (イベント ID) より後の差分をまとめて返す
+    broadcaster = live_updates._get_current_object()
+    seq = broadcaster.parse_event_id(request.args.get('after'))
+    events = broadcaster.events_after(seq)
+    last_id = broadcaster.event_id(events[-1][0] if events else seq)
+    response = jsonify(reset=events is None, last_id=last_id, poll_seconds=current_app.config['LIVE_POLL_SECONDS'],
+                       events=[{'id': broadcaster.event_id(event_seq), 'event': event, 'data': json.loads(payload)}
+                               for event_seq, event, payload in events or []])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
@@ -0,0 +1,131 @@
+from flask import g, request, has_request_context
+import json
+import base64
+import binascii
+from datetime import date, time
+from sqlalchemy import event, and_, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Team, Game, PlayerStat, Season
+
+# --- ルート共通のクエリヘルパー ---
+# テンプレートが参照する関連 (game.home_team / game.away_team / team.players) を先読みし、
+# 1試合・1チームごとに SELECT が追加で発行される (N+1) のを防ぐ。
+
+def games_with_teams(query=None):
+    # 試合カード用: ホーム・アウェイのチームを JOIN で同時に読み込む
+    return (query if query is not None else Game.query).options(joinedload(Game.home_team), joinedload(Game.away_team))
+
+def teams_with_players(query=None):
+    # ロスター用: チームの選手をまとめて1回の IN クエリで読み込む
+    return (query if query is not None else Team.query).options(selectinload(Team.players))
+
+def game_with_rosters(game_id):
+    # 結果入力用: 両チームとその選手まで読み込む
+    return Game.query.options(joinedload(Game.home_team).selectinload(Team.players),
+                              joinedload(Game.away_team).selectinload(Team.players)).get_or_404(game_id)
+
+
+# --- シーズンの絞り込み ---
+# 進行中のシーズンの ID は SQL のサブクエリで引くので、絞り込んでもクエリの数は増えず、プロセス間で古い値を持つこともない。
+def active_season_id():
+    return db.select(Season.id).where(Season.is_active == True).limit(1).scalar_subquery()
+
+def in_season(season_id=None, column=Game.season_id):
+    # 指定したシーズン (省略時は進行中のシーズン) の試合だけにする条件
+    return column == (season_id if season_id is not None else active_season_id())
+
+
+# --- 日程の絞り込みとキーセット・ページング ---
+# (game_date, start_time, id) の昇順で並べ、前のページの最後の試合より後ろだけを読む (OFFSET は使わない)。
+# 日付・時刻が未設定の試合は DB によらず末尾に並べる。
+SCHEDULE_ORDER = (Game.game_date.asc().nulls_last(), Game.start_time.asc().nulls_last(), Game.id.asc())
+
+def filter_games(query, team_id=None, game_date=None, date_from=None, date_to=None, is_finished=None, season_id=None):
+    # season_id を省略すると進行中のシーズンの試合だけ
+    query = query.filter(in_season(season_id))
+    if team_id: query = query.filter(or_(Game.home_team_id == team_id, Game.away_team_id == team_id))
+    if game_date: query = query.filter(Game.game_date == game_date)
+    if date_from: query = query.filter(Game.game_date >= date_from)
+    if date_to: query = query.filter(Game.game_date <= date_to)
+    if is_finished is not None: query = query.filter(Game.is_finished == is_finished)
+    return query
+
+def paginate_games(query, cursor, limit):
+    # (そのページの試合, 次のページのカーソル または None) を返す
+    if cursor: query = query.filter(_after_cursor(*cursor))
+    rows = query.order_by(*SCHEDULE_ORDER).limit(limit + 1).all()
+    return rows[:limit], (encode_cursor(rows[limit - 1]) if len(rows) > limit else None)
+
+def encode_cursor(game):
+    raw = json.dumps([game.game_date.isoformat() if game.game_date else None,
+                      game.start_time.isoformat() if game.start_time else None, game.id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    # カーソル文字列を (日付, 時刻, ID) に戻す。空なら None、壊れていれば ValueError
+    if not token: return None
+    try:
+        game_date, start_time, game_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        return (date.fromisoformat(game_date) if game_date else None,
+                time.fromisoformat(start_time) if start_time else None, int(game_id))
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError(f'invalid cursor: {token}') from e
+
+def _after_cursor(game_date, start_time, game_id):
+    if start_time is None: time_after = and_(Game.start_time.is_(None), Game.id > game_id)
+    else: time_after = or_(Game.start_time > start_time, and_(Game.start_time == start_time, Game.id > game_id), Game.start_time.is_(None))
+    if game_date is None: return and_(Game.game_date.is_(None), time_after)
+    return or_(Game.game_date > game_date, and_(Game.game_date == game_date, time_after), Game.game_date.is_(None))
+
+
+# --- EXPLAIN による索引利用の確認 (flask explain-queries) ---
+def route_queries():
+    # 各ルートの主要なクエリ。値は代表的なものを入れている
+    return {
+        'index: 今後の試合': Game.query.filter(in_season(), Game.is_finished == False).order_by(Game.game_date.asc(), Game.start_time.asc()),
+        'schedule: チームで絞り込み': filter_games(Game.query, team_id=1).order_by(*SCHEDULE_ORDER).limit(51),
+        'schedule: 日付で絞り込み': filter_games(Game.query, game_date=date.today()).order_by(*SCHEDULE_ORDER).limit(51),
+        'schedule: 全日程': filter_games(Game.query).order_by(*SCHEDULE_ORDER).limit(51),
+        '順位表: 対戦成績': Game.query.filter(in_season(), Game.is_finished == True),
+        'edit_game: ボックススコア': PlayerStat.query.filter_by(game_id=1),
+        'player: 試合ログ': filter_games(db.session.query(PlayerStat.id).join(Game, PlayerStat.game_id == Game.id).filter(
+            PlayerStat.player_id == 1)).order_by(*SCHEDULE_ORDER).limit(21),
+        'delete_player: 選手のスタッツ': PlayerStat.query.filter_by(player_id=1),
+        'delete_team: チームの試合': Game.query.filter(or_(Game.home_team_id == 1, Game.away_team_id == 1)),
+        'リーグ別のチーム': Team.query.filter_by(league='Aリーグ'),
+    }
+
+def explain_route_queries():
+    # [(ラベル, 索引を使っているか, 実行計画の行)] を返す
+    dialect = db.engine.dialect
+    results = []
+    with db.engine.connect() as conn:
+        if dialect.name == 'postgresql': conn.execute(text('SET enable_seqscan = off'))
+        for label, query in route_queries().items():
+            sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            if dialect.name == 'sqlite':
+                plan = [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+                uses_index = all('SCAN' not in line or 'USING' in line for line in plan)
+            else:
+                plan = [row[0] for row in conn.execute(text('EXPLAIN ' + sql))]
+                uses_index = not any('Seq Scan' in line for line in plan)
+            results.append((label, uses_index, plan))
+    return results
+
+
+# --- テスト用: 1リクエストあたりの SQL 発行数の上限チェック ---
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context(): g.sql_statement_count = g.get('sql_statement_count', 0) + 1
+
+def enforce_statement_limit(app):
+    # SQL_STATEMENT_LIMIT を設定すると、それを超える SQL を発行したリクエストを AssertionError にする。
+    # エンドポイントごとの上限は SQL_STATEMENT_LIMITS = {'public.schedule': 5, ...} で上書きできる
+    @app.after_request
+    def check_statement_limit(response):
+        limit = app.config.get('SQL_STATEMENT_LIMITS', {}).get(request.endpoint, app.config.get('SQL_STATEMENT_LIMIT'))
+        count = g.get('sql_statement_count', 0)
+        if limit is not None and count > limit:
+            raise AssertionError(f'{request.endpoint} issued {count} SQL statements (limit {limit})')
+        return response
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from collections import defaultdict
+
+# --- 総当たり日程の自動作成 ---
+# DB には触れず、チームの (ID, リーグ) から試合の一覧 (プラン) を作るだけ。
+# プランの各行は Game のカラム名をキーにした dict なので、確認後にそのまま一括 INSERT できる。
+#   1節 = 各チームが最大1試合する組み合わせ。1節を1日に割り当て、その日の試合を全ての開始時刻に振り分ける。
+
+PASSWORD_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+def round_robin_rounds(team_ids):
+    # サークル法による1回総当たり。[[(home, away), ...], ...] を節ごとに返す
+    # ホーム/アウェイは各チームの差が1以内になるように決める
+    teams = list(team_ids)
+    if len(teams) < 2: return []
+    fixed = None if len(teams) % 2 else teams.pop()
+    m = len(teams)  # 奇数
+    position = {team: i for i, team in enumerate(teams)}
+    rounds = []
+    for r in range(m):
+        # 節 r では teams[r] が休み (または固定チームと対戦) し、残りは r を軸に対称な位置どうしで対戦する
+        matchups = []
+        if fixed is not None: matchups.append((fixed, teams[r]) if r % 2 == 0 else (teams[r], fixed))
+        for k in range(1, m // 2 + 1):
+            a = teams[(r + k) % m]; b = teams[(r - k) % m]
+            # 奇数チームの総当たりでは「差 (mod m) が前半なら a がホーム」で全チームのホーム数がちょうど半分になる
+            matchups.append((a, b) if (position[b] - position[a]) % m <= m // 2 else (b, a))
+        rounds.append(matchups)
+    return rounds
+
+def balance_home_away(rounds):
+    # 節の組み合わせはそのままに、各チームのホーム数とアウェイ数の差が1以内になるようにホーム/アウェイを付け直す。
+    # 全試合を1つのグラフと見て、次数が奇数のチームを架空のチームにつないで全員を偶数にし、辺をたどった向きを
+    # (ホーム → アウェイ) とする。偶数次数のグラフのたどり道は必ず出発点に戻るので、どのチームも入った数と出た数が等しい
+    edges = [match for matchups in rounds for match in matchups]
+    adjacency = defaultdict(list)
+    for i, (x, y) in enumerate(edges): adjacency[x].append((i, y)); adjacency[y].append((i, x))
+    dummy = object()
+    for i, team in enumerate([team for team in list(adjacency) if len(adjacency[team]) % 2], start=len(edges)):
+        adjacency[team].append((i, dummy)); adjacency[dummy].append((i, team))
+    used, oriented = set(), {}
+    for start in list(adjacency):
+        while adjacency[start]:
+            current = start
+            while adjacency[current]:
+                i, other = adjacency[current].pop()
+                if i in used: continue
+                used.add(i); oriented[i] = current; current = other
+    balanced, i = [], 0
+    for matchups in rounds:
+        balanced.append([])
+        for x, y in matchups:
+            balanced[-1].append((x, y) if oriented[i] == x else (y, x)); i += 1
+    return balanced
+
+def inter_league_rounds(league_a, league_b):
+    # 2つのリーグ間の全カードを、各チーム1節1試合になるよう max(len) 節に並べる (ホーム/アウェイの差は各チーム1以内)
+    a, b = list(league_a), list(league_b)
+    if not a or not b: return []
+    if len(a) < len(b): a, b = b, a
+    return balance_home_away([[(team, a[(j + r) % len(a)]) for j, team in enumerate(b)] for r in range(len(a))])
+
+def build_rounds(teams, double=False, inter_league=False):
+    # teams: [(team_id, league), ...]。同じリーグの中で総当たりし、リーグ間の試合は別の節として後ろに足す
+    leagues = defaultdict(list)
+    for team_id, league in teams: leagues[league or ''].append(team_id)
+    per_league = [round_robin_rounds(team_ids) for team_ids in leagues.values()]
+    # リーグどうしはチームが重ならないので、同じ番号の節を1つにまとめる
+    rounds = [[match for league_rounds in per_league if i < len(league_rounds) for match in league_rounds[i]]
+              for i in range(max((len(league_rounds) for league_rounds in per_league), default=0))]
+    if inter_league:
+        groups = list(leagues.values())
+        for i in range(len(groups)):
+            for j in range(i + 1, len(groups)): rounds.extend(inter_league_rounds(groups[i], groups[j]))
+        # リーグ内とリーグ間でそれぞれ差が1以内でも、合わせると2になることがあるので全体で付け直す
+        rounds = balance_home_away(rounds)
+    if double: rounds += [[(away, home) for home, away in matchups] for matchups in rounds]
+    return rounds
+
+def matchdays(start_date, weekdays, blackout_dates=()):
+    # 開始日以降で、開催曜日かつ休止日でない日付を順に返す
+    weekdays = set(weekdays); blackout_dates = set(blackout_dates)
+    if not weekdays: raise ValueError('weekdays must not be empty')
+    current = start_date
+    while True:
+        if current.weekday() in weekdays and current not in blackout_dates: yield current
+        current += timedelta(days=1)
+
+def build_plan(teams, start_date, weekdays, times, double=False, inter_league=False, blackout_dates=()):
+    # [{'game_date', 'start_time', 'home_team_id', 'away_team_id', 'game_password'}, ...] を日付・時刻順で返す
+    if not times: raise ValueError('times must not be empty')
+    plan = []
+    for r, (day, matchups) in enumerate(zip(matchdays(start_date, weekdays, blackout_dates), build_rounds(teams, double, inter_league))):
+        # 節ごとに開始位置をずらし、同じチームがいつも同じ時刻にならないようにする
+        used = defaultdict(int)
+        for i, (home, away) in enumerate(matchups):
+            slot = (i + r) % len(times)
+            plan.append({'game_date': day, 'start_time': times[slot], 'home_team_id': home, 'away_team_id': away,
+                         'game_password': PASSWORD_ALPHABET[used[slot] % len(PASSWORD_ALPHABET)] * 4})
+            used[slot] += 1
+    plan.sort(key=lambda game: (game['game_date'], game['start_time']))
+    return plan
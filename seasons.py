@@ -0,0 +1,70 @@
+from datetime import datetime
+from collections import defaultdict
+from league import (current_season_id, rebuild_standings, rebuild_player_totals, calculate_all_standings, load_results_matrix,
+                    standing_row, rank_leaders)
+from models import (db, Season, Game, Team, Player, TeamStanding, PlayerSeasonTotals, SeasonStanding, SeasonPlayerTotals,
+                    STANDING_FIELDS, STAT_FIELDS, PLAYER_TOTAL_FIELDS)
+
+# --- シーズンの終了とアーカイブ ---
+# flask close-season は進行中のシーズンの順位表・選手成績を SeasonStanding / SeasonPlayerTotals に書き写して確定させ、
+# 集計テーブル (TeamStanding / PlayerSeasonTotals) を空にして次のシーズンを始める。試合とボックススコアは消さずに残す。
+# 終了したシーズンのページ (/seasons/<id>) はアーカイブの2つの表を読むだけなので、試合数によらず軽い。
+
+def assign_unseasoned_games():
+    # シーズン導入前の試合 (season_id が NULL) を進行中のシーズンに入れる (コミットは呼び出し側)。戻り値は (シーズン名, 移した試合数)
+    season_id = current_season_id()
+    moved = Game.query.filter(Game.season_id.is_(None)).update({Game.season_id: season_id}, synchronize_session=False)
+    return db.session.get(Season, season_id).name, moved
+
+def close_season(next_name=None, carry_over=False):
+    # 進行中のシーズンを確定させ、next_name のシーズンを始める (コミットまで行う)。
+    # 未消化の試合があれば ValueError。carry_over なら未消化の試合を次のシーズンに移す。戻り値は (終了したシーズン, 次のシーズン, 移した試合数)
+    season = Season.query.filter_by(is_active=True).first()
+    if season is None: raise ValueError('There is no active season.')
+    next_name = next_name or f'シーズン{Season.query.count() + 1}'
+    if Season.query.filter_by(name=next_name).first() is not None: raise ValueError(f'A season named {next_name!r} already exists.')
+    unfinished = Game.query.filter(Game.season_id == season.id, Game.is_finished == False)
+    if not carry_over and unfinished.count():
+        raise ValueError(f'{unfinished.count()} game(s) in {season.name} are not finished; finish or delete them, or pass --carry-over.')
+    # 差分で保守している集計テーブルを作り直してから書き写す (ずれがあってもアーカイブには正しい値が残る)
+    rebuild_standings(); rebuild_player_totals(); db.session.flush()
+    overall, by_league = calculate_all_standings(load_results_matrix())
+    league_rank = {row['team_id']: rank for rows in by_league.values() for rank, row in enumerate(rows, start=1)}
+    stored = {standing.team_id: standing for standing in TeamStanding.query.all()}
+    if overall:
+        db.session.execute(db.insert(SeasonStanding), [{
+            'season_id': season.id, 'team_id': row['team_id'], 'team_name': row['team_name'], 'league': row['league'],
+            'overall_rank': rank, 'league_rank': league_rank[row['team_id']],
+            **{field: getattr(stored.get(row['team_id']), field, 0) for field in STANDING_FIELDS}
+        } for rank, row in enumerate(overall, start=1)])
+    players = db.session.query(PlayerSeasonTotals, Player.name, Team.name).join(Player, PlayerSeasonTotals.player_id == Player.id).outerjoin(
+        Team, Player.team_id == Team.id).filter(PlayerSeasonTotals.games_played > 0).all()
+    if players:
+        db.session.execute(db.insert(SeasonPlayerTotals), [{
+            'season_id': season.id, 'player_id': totals.player_id, 'player_name': player_name, 'team_name': team_name,
+            **{field: getattr(totals, field) for field in PLAYER_TOTAL_FIELDS}
+        } for totals, player_name, team_name in players])
+    season.is_active = False; season.closed_at = datetime.now(); db.session.flush()
+    next_season = Season(name=next_name, is_active=True); db.session.add(next_season); db.session.flush()
+    moved = unfinished.update({Game.season_id: next_season.id}, synchronize_session=False) if carry_over else 0
+    TeamStanding.query.delete(synchronize_session=False); PlayerSeasonTotals.query.delete(synchronize_session=False)
+    db.session.commit()
+    return season, next_season, moved
+
+def closed_seasons():
+    return Season.query.filter(Season.is_active == False).order_by(Season.id.desc()).all()
+
+def season_archive(season_id):
+    # 終了したシーズンの順位表 (総合・リーグ別)・選手成績・スタッツリーダーをアーカイブの表から組み立てる
+    standings = SeasonStanding.query.filter_by(season_id=season_id).order_by(SeasonStanding.overall_rank).all()
+    overall = [{'team_id': row.team_id, 'team_name': row.team_name, 'league': row.league, 'league_rank': row.league_rank,
+                **standing_row(row)} for row in standings]
+    by_league = defaultdict(list)
+    for row in sorted(overall, key=lambda row: row['league_rank']): by_league[row['league']].append(row)
+    totals = SeasonPlayerTotals.query.filter_by(season_id=season_id).order_by(SeasonPlayerTotals.player_name, SeasonPlayerTotals.player_id).all()
+    players = [{'player_id': row.player_id, 'player_name': row.player_name, 'team_name': row.team_name, 'games_played': row.games_played,
+                **{f'avg_{field}': getattr(row, field) / row.games_played for field in STAT_FIELDS},
+                'fg_pct': row.fgm * 100.0 / row.fga if row.fga else 0, 'three_p_pct': row.three_pm * 100.0 / row.three_pa if row.three_pa else 0,
+                'ft_pct': row.ftm * 100.0 / row.fta if row.fta else 0} for row in totals]
+    leaders = rank_leaders([(row.player_id, row.player_name, row) for row in totals])
+    return overall, by_league, players, leaders
@@ -0,0 +1,87 @@
+// ライブスコア: /live (Server-Sent Events) で届く差分で、順位表の行と試合カードをその場で書き換える。
+// SSE に接続できない (同時接続数の上限・古いブラウザ) ときは /live/poll を一定間隔で問い合わせる。
+(function () {
+  const script = document.currentScript;
+  const liveUrl = script.dataset.liveUrl;
+  const pollUrl = script.dataset.pollUrl;
+  let lastId = script.dataset.lastEventId || '';
+
+  function span(className, value) {
+    const element = document.createElement('span');
+    if (className) element.className = className;
+    element.textContent = value;
+    return element;
+  }
+
+  // schedule.html の score-info と同じ表示を組み立てる
+  function renderScore(cell, game) {
+    if (!game.is_finished) { cell.replaceChildren(span('vs-text', 'vs')); return; }
+    if (game.winner_id !== null) {
+      const homeWon = game.winner_id === game.home_team_id;
+      cell.replaceChildren(span(homeWon ? 'forfeit-win' : 'forfeit-lose', homeWon ? '(不戦勝)' : '(不戦敗)'), ' - ',
+                           span(homeWon ? 'forfeit-lose' : 'forfeit-win', homeWon ? '(不戦敗)' : '(不戦勝)'));
+      return;
+    }
+    const home = game.home_score, away = game.away_score;
+    const className = (mine, theirs) => mine > theirs ? 'score-winner' : (mine < theirs ? 'score-loser' : '');
+    cell.replaceChildren(span(className(home, away), home), ' - ', span(className(away, home), away));
+  }
+
+  function applyGame(game) {
+    document.querySelectorAll(`.game-card[data-game-id="${game.id}"] .score-info`).forEach(cell => renderScore(cell, game));
+    if (game.is_finished) document.querySelectorAll(`.upcoming-game-item[data-game-id="${game.id}"]`).forEach(item => item.remove());
+  }
+
+  function setField(row, field, value) {
+    const cell = row.querySelector(`[data-field="${field}"]`);
+    if (cell) cell.textContent = value;
+  }
+
+  // 並び順はサーバーが勝点とタイブレーク (直接対決など) で決めて送るので、その順に並べ直して順位の列を振り直す
+  function resort(tbody, order) {
+    if (!order) return;
+    const position = new Map(order.map((teamId, i) => [String(teamId), i]));
+    const rows = Array.from(tbody.querySelectorAll('tr[data-team-id]'));
+    rows.sort((a, b) => (position.get(a.dataset.teamId) ?? rows.length) - (position.get(b.dataset.teamId) ?? rows.length));
+    rows.forEach((row, i) => { tbody.appendChild(row); setField(row, 'rank', i + 1); });
+  }
+
+  function applyStandings(standings, order) {
+    standings.forEach(values => {
+      document.querySelectorAll(`tr[data-team-id="${values.team_id}"]`).forEach(row => {
+        ['wins', 'losses', 'points', 'diff'].forEach(field => setField(row, field, values[field]));
+        setField(row, 'avg_pf', values.avg_pf.toFixed(1));
+        setField(row, 'avg_pa', values.avg_pa.toFixed(1));
+      });
+    });
+    document.querySelectorAll('tbody[data-standings]').forEach(tbody => resort(tbody, order[tbody.dataset.standings]));
+  }
+
+  function handle(event, data) {
+    if (event === 'game') { applyGame(data.game); applyStandings(data.standings, data.order || {}); }
+  }
+
+  function poll() {
+    fetch(`${pollUrl}?after=${encodeURIComponent(lastId)}`, {cache: 'no-store'})
+      .then(response => response.json())
+      .then(body => {
+        if (body.reset) { location.reload(); return; }
+        body.events.forEach(event => handle(event.event, event.data));
+        lastId = body.last_id;
+        setTimeout(poll, body.poll_seconds * 1000);
+      })
+      .catch(() => setTimeout(poll, 30000));
+  }
+
+  function connect() {
+    if (!window.EventSource) { poll(); return; }
+    // 再接続のときはブラウザが Last-Event-ID ヘッダーを付けるので、サーバーはそちらを優先する
+    const source = new EventSource(lastId ? `${liveUrl}?last_event_id=${encodeURIComponent(lastId)}` : liveUrl);
+    source.addEventListener('game', event => { lastId = event.lastEventId; handle('game', JSON.parse(event.data)); });
+    source.addEventListener('reset', () => { source.close(); location.reload(); });
+    // 503 (同時接続数の上限) などで接続できなければ、ポーリングに切り替える
+    source.onerror = () => { if (source.readyState === EventSource.CLOSED) poll(); };
+  }
+
+  connect();
+})();
@@ -0,0 +1,48 @@
+import random
+from datetime import date, time
+from models import db, Team, Player, Game, PlayerStat, STAT_FIELDS
+from scheduler import build_plan
+from league import current_season_id
+
+# --- ベンチマーク用の架空リーグ (flask seed-benchmark) ---
+# 同じ引数なら常に同じデータになる。本物のモデルに一括 INSERT するので、アプリのクエリがそのまま試せる。
+# 日程は scheduler.py の総当たり (リーグ内・交流戦とも2回) から先頭 games 試合を使い、前から finished の割合を終了済みにする。
+
+LEAGUES = ('Aリーグ', 'Bリーグ')
+LINEUP_SIZE = 10
+
+def generate_league(teams=32, players_per_team=15, games=500, finished=0.8, seed=0, start_date=date(2025, 1, 6)):
+    # 戻り値は作成した件数 {'teams': ..., 'players': ..., 'games': ..., 'player_stats': ...}
+    rng = random.Random(seed)
+    team_rows = [{'id': t, 'name': f'Team {t:03d}', 'league': LEAGUES[t % len(LEAGUES)]} for t in range(1, teams + 1)]
+    roster = {t['id']: [(t['id'] - 1) * players_per_team + p for p in range(1, players_per_team + 1)] for t in team_rows}
+    player_rows = [{'id': player_id, 'name': f'Player {player_id:05d}', 'team_id': team_id}
+                   for team_id, player_ids in roster.items() for player_id in player_ids]
+    plan = build_plan([(t['id'], t['league']) for t in team_rows], start_date, [1, 3, 5], [time(22, 0), time(22, 40), time(23, 20)],
+                      double=True, inter_league=True)[:games]
+    finished_count = int(len(plan) * finished); stat_rows = []; season_id = current_season_id()
+    for game_id, game in enumerate(plan, start=1):
+        game['id'] = game_id; game['season_id'] = season_id
+        if game_id > finished_count: continue
+        scores = {}
+        for team_id in (game['home_team_id'], game['away_team_id']):
+            scores[team_id] = 0
+            for player_id in rng.sample(roster[team_id], min(LINEUP_SIZE, len(roster[team_id]))):
+                stat = _box_score(rng); scores[team_id] += stat['pts']
+                stat_rows.append({'game_id': game_id, 'player_id': player_id, **stat})
+        game.update(is_finished=True, home_score=scores[game['home_team_id']], away_score=scores[game['away_team_id']])
+    db.session.execute(db.insert(Team), team_rows)
+    db.session.execute(db.insert(Player), player_rows)
+    if plan: db.session.execute(db.insert(Game), plan)
+    if stat_rows: db.session.execute(db.insert(PlayerStat), stat_rows)
+    db.session.commit()
+    return {'teams': len(team_rows), 'players': len(player_rows), 'games': len(plan), 'player_stats': len(stat_rows)}
+
+def _box_score(rng):
+    fga = rng.randint(2, 22); three_pa = rng.randint(0, fga // 2); fta = rng.randint(0, 8)
+    fgm = sum(rng.random() < 0.47 for _ in range(fga)); three_pm = min(sum(rng.random() < 0.35 for _ in range(three_pa)), fgm)
+    ftm = sum(rng.random() < 0.75 for _ in range(fta))
+    values = {'pts': 2 * fgm + three_pm + ftm, 'ast': rng.randint(0, 10), 'reb': rng.randint(0, 12), 'stl': rng.randint(0, 4),
+              'blk': rng.randint(0, 3), 'foul': rng.randint(0, 5), 'turnover': rng.randint(0, 5),
+              'fgm': fgm, 'fga': fga, 'three_pm': three_pm, 'three_pa': three_pa, 'ftm': ftm, 'fta': fta}
+    return {field: values[field] for field in STAT_FIELDS}
@@ -0,0 +1,117 @@
+# 集計テーブル (TeamStanding / PlayerSeasonTotals) を差分で保守する書き込み経路の回帰テスト。
+# 管理画面・インポートで書き込んだ後、全件から作り直した値と保存済みの値が一致する (ドリフトが 0) ことを確かめる。
+import io
+import os
+import sys
+import random
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from models import db, Game, Player, PlayerStat, STAT_FIELDS
+from league import current_season_id, rebuild_standings, rebuild_player_totals, write_box_score
+from synthetic import generate_league
+
+@pytest.fixture
+def app():
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SLOW_REQUEST_MS': None})
+    with app.app_context():
+        db.create_all(); current_season_id()
+        generate_league(teams=6, players_per_team=6, games=40, finished=0.8, seed=1)
+        rebuild_standings(); rebuild_player_totals(); db.session.commit()
+        yield app
+        db.session.remove(); db.drop_all()
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    client.post('/register', data={'username': 'admin', 'password': 'pw'}); client.post('/login', data={'username': 'admin', 'password': 'pw'})
+    return client
+
+def assert_no_drift():
+    # 集計テーブルが全件からの再計算と一致し、各試合のスコアがボックススコア (所属チームごとの得点の合計) と一致する
+    db.session.expire_all()
+    standings, totals = rebuild_standings(), rebuild_player_totals()
+    db.session.rollback()
+    assert standings == [] and totals == []
+    team_of = dict(db.session.query(Player.id, Player.team_id))
+    for game in Game.query.filter(Game.is_finished == True, Game.winner_id.is_(None)):
+        stats = PlayerStat.query.filter_by(game_id=game.id).all()
+        if not stats: continue
+        assert (game.home_score, game.away_score) == (sum(stat.pts or 0 for stat in stats if team_of.get(stat.player_id) == game.home_team_id),
+                                                      sum(stat.pts or 0 for stat in stats if team_of.get(stat.player_id) == game.away_team_id))
+
+def finished_games(limit):
+    return Game.query.filter(Game.is_finished == True, Game.winner_id.is_(None)).order_by(Game.id).limit(limit).all()
+
+def edit_form(game, rng, players=None):
+    form = {'version': game.version or 0, 'youtube_url_home': '', 'youtube_url_away': ''}
+    roster = players or [player.id for player in game.home_team.players + game.away_team.players]
+    for player_id in rng.sample(roster, min(6, len(roster))):
+        for field in STAT_FIELDS: form[f'player_{player_id}_{field}'] = rng.randint(0, 20)
+    return form
+
+def test_edit_game_keeps_rollups_in_sync(admin):
+    rng = random.Random(0)
+    for game in finished_games(8):
+        assert admin.post(f'/game/{game.id}/edit', data=edit_form(game, rng)).status_code == 302
+    assert_no_drift()
+    # 同じ試合をもう一度保存し直しても (UPDATE / INSERT / DELETE が混ざる) ずれない
+    for game in finished_games(8):
+        db.session.refresh(game)
+        assert admin.post(f'/game/{game.id}/edit', data=edit_form(game, rng)).status_code == 302
+    assert_no_drift()
+
+def test_edit_game_rejects_stale_version(admin):
+    game = finished_games(1)[0]; form = edit_form(game, random.Random(1))
+    admin.post(f'/game/{game.id}/edit', data=form)
+    stats_after_first = sorted((stat.player_id, stat.pts) for stat in PlayerStat.query.filter_by(game_id=game.id))
+    stale = {**edit_form(game, random.Random(2)), 'version': form['version']}
+    response = admin.post(f'/game/{game.id}/edit', data=stale, follow_redirects=True)
+    assert '先に更新しました' in response.get_data(as_text=True)
+    assert sorted((stat.player_id, stat.pts) for stat in PlayerStat.query.filter_by(game_id=game.id)) == stats_after_first
+    assert_no_drift()
+
+def test_write_box_score_reports_only_changed_players(app):
+    game = finished_games(1)[0]
+    stored = {stat.player_id: {field: getattr(stat, field) or 0 for field in STAT_FIELDS} for stat in PlayerStat.query.filter_by(game_id=game.id)}
+    changed = next(iter(stored))
+    submitted = {player_id: dict(values) for player_id, values in stored.items()}; submitted[changed]['ast'] += 1
+    change = write_box_score(game.id, submitted)
+    assert list(change) == [changed]
+    before, after = change[changed]
+    assert after['ast'] - before['ast'] == 1 and before['games_played'] == after['games_played'] == 1
+    db.session.rollback()
+
+def test_forfeit_keeps_rollups_in_sync(admin):
+    games = finished_games(5)
+    for game in games:
+        response = admin.post(f'/game/{game.id}/forfeit', data={'winning_team_id': game.away_team_id, 'version': game.version or 0})
+        assert response.status_code == 302
+    assert PlayerStat.query.filter(PlayerStat.game_id.in_([game.id for game in games])).count() == 0
+    assert_no_drift()
+
+def test_deletes_keep_rollups_in_sync(admin):
+    for game in finished_games(4): admin.post(f'/game/delete/{game.id}')
+    assert_no_drift()
+    player_id = db.session.query(PlayerStat.player_id).first()[0]
+    admin.post(f'/player/delete/{player_id}')
+    assert db.session.get(Player, player_id) is None
+    assert_no_drift()
+    # 移籍してきた選手が他チームどうしの試合に成績を持つ状態でチームを削除する
+    stat = PlayerStat.query.join(Game, PlayerStat.game_id == Game.id).filter(Game.home_team_id != 3, Game.away_team_id != 3).first()
+    db.session.get(Player, stat.player_id).team_id = 3; db.session.commit()
+    admin.post('/team/delete/3')
+    assert_no_drift()
+
+def test_import_keeps_rollups_in_sync(admin):
+    rng = random.Random(3)
+    lines = ['game_id,player_id,' + ','.join(STAT_FIELDS)]
+    for game in Game.query.order_by(Game.id).limit(10).all():
+        for player in rng.sample(game.home_team.players + game.away_team.players, 6):
+            fga = rng.randint(5, 20); fgm = rng.randint(0, fga)
+            values = {field: 0 for field in STAT_FIELDS}; values.update(pts=2 * fgm, fga=fga, fgm=fgm, ast=rng.randint(0, 9))
+            lines.append(f'{game.id},{player.id},' + ','.join(str(values[field]) for field in STAT_FIELDS))
+    data = {'results_file': (io.BytesIO('\n'.join(lines).encode('utf-8')), 'results.csv')}
+    response = admin.post('/import_results', data=data, content_type='multipart/form-data')
+    assert response.status_code == 200 and 'エラー: 0行' in response.get_data(as_text=True)
+    assert_no_drift()
@@ -0,0 +1,44 @@
+# 日程の自動作成 (scheduler.py): 各チームのホーム数とアウェイ数の差が1以内で、どのカードもちょうど1回 (double なら2回) になること
+import os
+import sys
+from collections import Counter
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import build_rounds, inter_league_rounds
+
+SPLITS = [(4, 4), (5, 5), (6, 6), (5, 4), (4, 5), (3, 6), (6, 5), (7, 2), (1, 2)]
+
+def league_teams(size_a, size_b):
+    a = list(range(1, size_a + 1)); b = list(range(101, 101 + size_b))
+    return a, b, [(team, 'Aリーグ') for team in a] + [(team, 'Bリーグ') for team in b]
+
+def summarize(rounds):
+    home, away, cards = Counter(), Counter(), Counter()
+    for matchups in rounds:
+        playing = [team for match in matchups for team in match]
+        assert len(playing) == len(set(playing)), 'a team plays twice in one round'
+        for h, a in matchups: home[h] += 1; away[a] += 1; cards[frozenset((h, a))] += 1
+    return home, away, cards
+
+@pytest.mark.parametrize('size_a,size_b', SPLITS)
+def test_inter_league_rounds_balance_home_and_away(size_a, size_b):
+    a, b, _ = league_teams(size_a, size_b)
+    home, away, cards = summarize(inter_league_rounds(a, b))
+    assert all(abs(home[team] - away[team]) <= 1 for team in a + b)
+    assert len(cards) == size_a * size_b and set(cards.values()) == {1}
+
+@pytest.mark.parametrize('size_a,size_b', SPLITS)
+@pytest.mark.parametrize('inter_league', [False, True])
+def test_season_balances_home_and_away(size_a, size_b, inter_league):
+    a, b, teams = league_teams(size_a, size_b)
+    home, away, cards = summarize(build_rounds(teams, inter_league=inter_league))
+    assert all(abs(home[team] - away[team]) <= 1 for team in a + b)
+    expected = size_a * (size_a - 1) // 2 + size_b * (size_b - 1) // 2 + (size_a * size_b if inter_league else 0)
+    assert len(cards) == expected and set(cards.values()) == {1}
+
+@pytest.mark.parametrize('size_a,size_b', SPLITS)
+def test_double_round_robin_is_exactly_even(size_a, size_b):
+    a, b, teams = league_teams(size_a, size_b)
+    home, away, cards = summarize(build_rounds(teams, double=True, inter_league=True))
+    assert all(home[team] == away[team] for team in a + b)
+    assert set(cards.values()) == {2}
@@ -0,0 +1,42 @@
+# 主要ページの SQL 件数の上限 (enforce_statement_limit) を実際に動かす回帰テスト。
+# 件数が試合数・選手数によらず一定であることを、大きさの違う2つの架空リーグで確かめる (N+1 になると上限を超えて失敗する)。
+#   python -m pytest -q tests
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import create_app
+from models import db
+from league import current_season_id, rebuild_standings, rebuild_player_totals
+from synthetic import generate_league
+
+# エンドポイントごとの上限 (キャッシュの効いていない最初の表示で数える)
+ROUTE_LIMITS = {
+    'public.index': 4, 'public.schedule': 2, 'public.stats_page': 7, 'public.api_games': 1, 'public.player_page': 5,
+    'public.api_player': 3, 'public.seasons': 2, 'public.live_poll': 0, 'admin.edit_game': 4,
+    'admin.roster': 4, 'admin.add_schedule': 2,
+}
+PUBLIC_PAGES = ['/', '/schedule', '/stats', '/api/games', '/player/1', '/api/players/1', '/seasons', '/live/poll', '/game/1/edit']
+ADMIN_PAGES = ['/roster', '/add_schedule']
+
+@pytest.fixture(params=[20, 200], ids=lambda games: f'{games}games')
+def client(request):
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'SLOW_REQUEST_MS': None,
+                      'SQL_STATEMENT_LIMIT': 0, 'SQL_STATEMENT_LIMITS': ROUTE_LIMITS})
+    with app.app_context():
+        db.create_all(); current_season_id()
+        generate_league(teams=8, players_per_team=8, games=request.param, finished=0.8, seed=0)
+        rebuild_standings(); rebuild_player_totals(); db.session.commit()
+    yield app.test_client()
+    with app.app_context(): db.drop_all()
+
+@pytest.mark.parametrize('path', PUBLIC_PAGES)
+def test_public_page_statement_limit(client, path):
+    assert client.get(path).status_code == 200
+
+@pytest.mark.parametrize('path', ADMIN_PAGES)
+def test_admin_page_statement_limit(client, path):
+    app = client.application
+    app.config['SQL_STATEMENT_LIMITS'] = {**ROUTE_LIMITS, 'auth.register': None, 'auth.login': None}
+    client.post('/register', data={'username': 'admin', 'password': 'pw'}); client.post('/login', data={'username': 'admin', 'password': 'pw'})
+    assert client.get(path).status_code == 200
@@ -0,0 +1,43 @@
+# 順位表のタイブレーク (tiebreakers.py): 勝点が並んだチームを直接対決 → 得失点差 → 総得点 → チーム ID の順で並べる
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tiebreakers import DEFAULT_TIEBREAKERS, build_results_matrix, parse_tiebreakers, rank_standings
+
+def row(team_id, points, diff=0, points_for=0):
+    return {'team_id': team_id, 'points': points, 'diff': diff, 'points_for': points_for}
+
+def order(rows, games, chain=DEFAULT_TIEBREAKERS):
+    return [r['team_id'] for r in rank_standings(rows, build_results_matrix(games), chain)]
+
+def test_head_to_head_wins_beat_point_differential():
+    # 1 と 2 は勝点・全体の得失点差で 1 が上だが、直接対決は 2 の勝ち
+    games = [(2, 1, 70, 60, None, None)]
+    assert order([row(1, 10, diff=30), row(2, 10, diff=5), row(3, 12)], games) == [3, 2, 1]
+
+def test_three_way_tie_uses_only_games_between_tied_teams():
+    # 1・2・3 が並び、3 が 1 と 2 に勝っている。4 (勝点が違う) に負けた試合は直接対決に数えない
+    games = [(3, 1, 80, 70, None, None), (2, 3, 60, 65, None, None), (1, 2, 75, 70, None, None),
+             (4, 3, 90, 50, None, None)]
+    assert order([row(1, 8, diff=20), row(2, 8, diff=10), row(3, 8, diff=-40), row(4, 9)], games) == [4, 3, 1, 2]
+
+def test_head_to_head_differential_then_overall_differential():
+    # 1 と 2 は1勝ずつで、直接対決の得失点差は 2 が上。3 と 4 は対戦がないので全体の得失点差で決まる
+    games = [(1, 2, 61, 60, None, None), (2, 1, 80, 60, None, None)]
+    assert order([row(1, 6, diff=50), row(2, 6, diff=0), row(3, 4, diff=-3), row(4, 4, diff=7)], games) == [2, 1, 4, 3]
+
+def test_forfeit_counts_as_head_to_head_win_without_points():
+    # 不戦勝は勝数だけ数え、得失点差には入れない
+    matrix = build_results_matrix([(1, 2, 0, 0, 2, 1)])
+    assert matrix[2][1] == [1, 0] and matrix[1][2] == [0, 0]
+    assert order([row(1, 3, diff=10), row(2, 3)], [(1, 2, 0, 0, 2, 1)]) == [2, 1]
+
+def test_unbroken_tie_falls_back_to_team_id():
+    assert order([row(5, 3, diff=1, points_for=10), row(2, 3, diff=1, points_for=10)], []) == [2, 5]
+
+def test_custom_chain_and_validation():
+    games = [(2, 1, 70, 60, None, None)]
+    # 直接対決を使わない設定なら全体の得失点差で決まる
+    assert order([row(1, 10, diff=30), row(2, 10, diff=5)], games, parse_tiebreakers('diff, points_for')) == [1, 2]
+    with pytest.raises(ValueError): parse_tiebreakers('h2h_wins,coin_flip')
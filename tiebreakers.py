@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+# --- 順位表のタイブレーク ---
+# 勝点が並んだチームの順位を、TIEBREAKERS の順に決める。直接対決の成績は終了済みの試合を1回なめて作る
+# 対戦成績表 (チーム x 相手 -> [勝数, 得失点差]) から引くだけなので、並んだチームの組ごとにクエリを発行しない。
+# k チームが並んだときは、その k チーム内の直接対決だけを O(k^2) で集計してから、各チームのキーで並べる。
+# どの基準でも並んだままならチーム ID 順 (これまでと同じ並び) にする。
+
+TIEBREAKERS = {
+    'h2h_wins': '直接対決の勝数 (並んだチーム同士の試合のみ)',
+    'h2h_diff': '直接対決の得失点差',
+    'diff': '全試合の得失点差',
+    'points_for': '全試合の総得点',
+}
+DEFAULT_TIEBREAKERS = ('h2h_wins', 'h2h_diff', 'diff', 'points_for')
+
+def parse_tiebreakers(value):
+    # 'h2h_wins,h2h_diff,diff' のような文字列を検証してタプルにする
+    chain = tuple(name.strip() for name in value.split(',') if name.strip()) if isinstance(value, str) else tuple(value)
+    unknown = [name for name in chain if name not in TIEBREAKERS]
+    if unknown: raise ValueError(f'Unknown tiebreaker(s): {", ".join(unknown)} (choose from {", ".join(TIEBREAKERS)})')
+    return chain
+
+def build_results_matrix(games):
+    # games: (home_team_id, away_team_id, home_score, away_score, winner_id, loser_id) の終了済みの試合
+    # 戻り値 matrix[team][opponent] = [勝数, 得失点差]。不戦勝/不戦敗は勝敗だけ数え、得失点には入れない (順位表と同じ)
+    matrix = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    for home, away, home_score, away_score, winner_id, loser_id in games:
+        if winner_id is not None:
+            loser = loser_id if loser_id is not None else (away if winner_id == home else home)
+            matrix[winner_id][loser][0] += 1; matrix[loser][winner_id]  # 対戦したことは残す
+            continue
+        home_score, away_score = home_score or 0, away_score or 0
+        if home_score > away_score: matrix[home][away][0] += 1
+        elif away_score > home_score: matrix[away][home][0] += 1
+        matrix[home][away][1] += home_score - away_score; matrix[away][home][1] += away_score - home_score
+    return matrix
+
+def _group_keys(group, matrix, chain):
+    # 並んだチーム内の直接対決を集計し、チームごとのソートキー (大きいほど上位) を作る
+    team_ids = [row['team_id'] for row in group]
+    keys = {}
+    for row in group:
+        results = matrix.get(row['team_id'], {})
+        h2h_wins = h2h_diff = 0
+        for opponent in team_ids:
+            if opponent == row['team_id'] or opponent not in results: continue
+            wins, diff = results[opponent]; h2h_wins += wins; h2h_diff += diff
+        values = {'h2h_wins': h2h_wins, 'h2h_diff': h2h_diff, 'diff': row['diff'], 'points_for': row['points_for']}
+        keys[row['team_id']] = tuple(-values[name] for name in chain) + (row['team_id'],)
+    return keys
+
+def rank_standings(rows, matrix, chain=DEFAULT_TIEBREAKERS):
+    # rows (team_id, points, diff, points_for を持つ dict) を勝点の多い順に並べ、勝点が同じチームはタイブレークで並べる
+    ordered = sorted(rows, key=lambda row: (-row['points'], row['team_id']))
+    ranked, start = [], 0
+    while start < len(ordered):
+        end = start + 1
+        while end < len(ordered) and ordered[end]['points'] == ordered[start]['points']: end += 1
+        group = ordered[start:end]
+        if len(group) > 1:
+            keys = _group_keys(group, matrix, chain); group.sort(key=lambda row: keys[row['team_id']])
+        ranked.extend(group); start = end
+    return ranked